@@ -0,0 +1,330 @@
+"""
+Offline end-to-end benchmark of the MuraDeck backend.
+
+main.py is loaded against the stub `decky` and `settings` modules in
+benchmarks/stubs, with HOME pointed at a temp dir whose Shaders dir is seeded
+from defaults/shaders. gamescope is either a fake X server reached through the
+plugin's native client (--transport x11) or a fake `xprop` on PATH
+(--transport xprop).
+
+Each scenario fires events and times them to the GAMESCOPE_RESHADE_EFFECT
+write they cause:
+  brightness  brightness_state() across a mura level threshold
+  jitter      +-2 % brightness noise around the 45 % SDR threshold at 10/s,
+              effect writes without hysteresis and with the default band
+  colorspace  a colorspace line appended to console-linux.txt
+  game_start  on_game_state_update() start/stop of a game with per-app CAS
+  monitor     OnScreenChanged lines appended to systemdisplaymanager.txt
+plus _patch_fx throughput for new and already rendered states.
+
+    python benchmarks/bench.py [--events 100] [--transport x11] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+FAKE_XPROP = """#!/bin/sh
+echo "$*" >> "$BENCH_XPROP_LOG"
+case "$*" in
+    *-set*) exit 0 ;;
+esac
+for arg; do
+    case "$arg" in
+        -*) ;;
+        *) echo "$arg(CARDINAL) = 0" ;;
+    esac
+done
+"""
+
+
+def summarize(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        "max_ms": round(ordered[-1], 3),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+    }
+
+
+class SubprocessCounter:
+    """Counts processes the plugin spawns through asyncio."""
+
+    def __init__(self):
+        self.count = 0
+        self._shell = asyncio.create_subprocess_shell
+        self._exec = asyncio.create_subprocess_exec
+
+    def install(self):
+        async def shell(*args, **kwargs):
+            self.count += 1
+            return await self._shell(*args, **kwargs)
+
+        async def exec_(*args, **kwargs):
+            self.count += 1
+            return await self._exec(*args, **kwargs)
+
+        asyncio.create_subprocess_shell = shell
+        asyncio.create_subprocess_exec = exec_
+
+
+def prepare_home(root: str, transport: str) -> dict:
+    home = os.path.join(root, "home")
+    shaders = os.path.join(home, ".local/share/gamescope/reshade/Shaders")
+    logs = os.path.join(home, ".steam/steam/logs")
+    settings_dir = os.path.join(root, "settings")
+    for d in (shaders, logs, settings_dir):
+        os.makedirs(d, exist_ok=True)
+    for name in os.listdir(os.path.join(REPO_DIR, "defaults", "shaders")):
+        shutil.copy(os.path.join(REPO_DIR, "defaults", "shaders", name), shaders)
+    for name in ("console-linux.txt", "gameprocess_log.txt", "systemdisplaymanager.txt"):
+        open(os.path.join(logs, name), "w").close()
+
+    os.environ["HOME"] = home
+    os.environ["DECKY_PLUGIN_SETTINGS_DIR"] = settings_dir
+    os.environ["DECKY_PLUGIN_RUNTIME_DIR"] = os.path.join(root, "runtime")
+    os.environ["DECKY_PLUGIN_LOG_DIR"] = os.path.join(root, "log")
+    os.environ.pop("XAUTHORITY", None)
+
+    if transport == "xprop":
+        bin_dir = os.path.join(root, "bin")
+        os.makedirs(bin_dir)
+        xprop = os.path.join(bin_dir, "xprop")
+        with open(xprop, "w") as f:
+            f.write(FAKE_XPROP)
+        os.chmod(xprop, 0o755)
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+        os.environ["BENCH_XPROP_LOG"] = os.path.join(root, "xprop.log")
+
+    # Decky puts py_modules on the path of the plugin process
+    sys.path[:0] = [os.path.join(BENCH_DIR, "stubs"), REPO_DIR, os.path.join(REPO_DIR, "py_modules")]
+
+
+class Bench:
+    def __init__(self, main, plugin, counter: SubprocessCounter, events: int, gap: float):
+        self.main = main
+        self.plugin = plugin
+        self.counter = counter
+        self.events = events
+        self.gap = gap
+        self._written = asyncio.Event()
+        self._written_at = 0.0
+        self.writes = 0
+
+        write = plugin._write_root_utf8
+
+        async def traced(display: str, name: str, value: str) -> bool:
+            ok = await write(display, name, value)
+            if ok and name == "GAMESCOPE_RESHADE_EFFECT":
+                self._written_at = time.perf_counter()
+                self.writes += 1
+                self._written.set()
+            return ok
+
+        plugin._write_root_utf8 = traced
+
+    async def _timed(self, fire) -> float | None:
+        await asyncio.sleep(self.gap)
+        self._written.clear()
+        started = time.perf_counter()
+        await fire()
+        try:
+            await asyncio.wait_for(self._written.wait(), timeout=2.0)
+        except asyncio.TimeoutError:
+            return None
+        return (self._written_at - started) * 1000.0
+
+    @staticmethod
+    def xprop_runs() -> int:
+        try:
+            with open(os.environ["BENCH_XPROP_LOG"]) as f:
+                return sum(1 for _ in f)
+        except (KeyError, OSError):
+            return 0
+
+    async def scenario(self, name: str, fire_for) -> dict:
+        spawned = self.counter.count
+        xprop_runs = self.xprop_runs()
+        samples, missed = [], 0
+        for i in range(self.events):
+            ms = await self._timed(lambda: fire_for(i))
+            if ms is None:
+                missed += 1
+            else:
+                samples.append(ms)
+        result = summarize(samples)
+        result["missed"] = missed
+        result["subprocesses"] = self.counter.count - spawned
+        result["xprop_runs"] = self.xprop_runs() - xprop_runs
+        return result
+
+    async def brightness(self) -> dict:
+        async def fire(i):
+            await self.plugin.brightness_state(80 if i % 2 else 20)
+        return await self.scenario("brightness", fire)
+
+    async def jitter(self) -> dict:
+        result = {}
+        for band in (0, self.main.BRIGHTNESS_HYSTERESIS):
+            await self.plugin.set_brightness_hysteresis(band)
+            await self.plugin.brightness_state(60)
+            await asyncio.sleep(0.3)
+            rng = random.Random(1)
+            writes = self.writes
+            for _ in range(self.events):
+                await self.plugin.brightness_state(45 + rng.randint(-2, 2))
+                await asyncio.sleep(0.1)
+            await asyncio.sleep(0.3)
+            result[f"hysteresis_{band}"] = {"events": self.events, "effect_writes": self.writes - writes}
+        await self.plugin.set_brightness_hysteresis(self.main.BRIGHTNESS_HYSTERESIS)
+        return result
+
+    async def colorspace(self) -> dict:
+        log = self.main.LOG_LINUX
+
+        async def fire(i):
+            cs = "HDR10_ST2084" if i % 2 == 0 else "SRGB_NONLINEAR"
+            with open(log, "a") as f:
+                f.write(f"[gamescope] [Info]  xdg_backend: colorspace: {cs}\n")
+        return await self.scenario("colorspace", fire)
+
+    async def game_start(self) -> dict:
+        appid = 1091500
+        await self.plugin.set_cas_perapp_enabled(appid, True)
+        await self.plugin.set_app_cas(appid, True)
+
+        async def fire(i):
+            await self.plugin.on_game_state_update(appid, i % 2 == 0)
+        return await self.scenario("game_start", fire)
+
+    async def monitor(self) -> dict:
+        log = self.main.LOG_DISPLAYMGR
+
+        async def fire(i):
+            with open(log, "a") as f:
+                f.write(f"[2025-01-01 12:00:00] OnScreenChanged: gamescope event external: {i % 2}\n")
+        return await self.scenario("monitor", fire)
+
+    async def patch_fx(self) -> dict:
+        EffectState = self.main.EffectState
+        states = [
+            EffectState(self.main.FX_SDR, map_scale=0.05 + i * 0.0001, sharpness=(i % 10) / 10)
+            for i in range(self.events)
+        ]
+        result = {}
+        for label, batch in (("new", states), ("cached", states)):
+            started = time.perf_counter()
+            for state in batch:
+                await self.plugin._patch_fx(state)
+            elapsed = time.perf_counter() - started
+            result[f"{label}_ops_per_s"] = round(len(batch) / elapsed, 1)
+            result[f"{label}_ms_per_op"] = round(elapsed * 1000.0 / len(batch), 3)
+        return result
+
+
+async def run(args) -> dict:
+    root = tempfile.mkdtemp(prefix="muradeck-bench-")
+    try:
+        prepare_home(root, args.transport)
+        counter = SubprocessCounter()
+        counter.install()
+
+        import main
+        from fakex import FakeXServer
+
+        servers = []
+        plugin = main.Plugin()
+        if args.transport == "x11":
+            clients = {}
+            for display in (":0", ":1"):
+                server = FakeXServer(os.path.join(root, f"X{display[1:]}"))
+                await server.start()
+                servers.append(server)
+                if display == ":0":
+                    server.set_cardinal(main.X_PROP_FOCUSED_APP, 0)
+                    server.set_cardinal(main.X_PROP_HDR_FEEDBACK, 0)
+                clients[display] = main.XPropertyClient(display, socket_path=server.path)
+            plugin._x11 = clients
+        else:
+            # No X socket, so every property access falls back to xprop
+            missing = os.path.join(root, "no-such-socket")
+            plugin._x11 = {d: main.XPropertyClient(d, socket_path=missing) for d in (":0", ":1")}
+            main.decky.logger.setLevel("ERROR")
+
+        await plugin._main()
+        await plugin.toggle_enabled(True)
+        await asyncio.sleep(0.3)
+
+        bench = Bench(main, plugin, counter, args.events, args.gap)
+        results = {
+            "brightness": await bench.brightness(),
+            "jitter": await bench.jitter(),
+            "colorspace": await bench.colorspace(),
+            "game_start": await bench.game_start(),
+            "monitor": await bench.monitor(),
+            "patch_fx": await bench.patch_fx(),
+        }
+        await plugin._unload()
+        for server in servers:
+            await server.stop()
+
+        return {
+            "transport": args.transport,
+            "events": args.events,
+            "gap_s": args.gap,
+            "python": platform.python_version(),
+            "settings_commits": main.settings.commits,
+            "variants": {"hits": plugin._variants.hits, "misses": plugin._variants.misses},
+            "xprop_helpers": {d: h.stats() for d, h in plugin._xprop.items()},
+            "x_snapshot": plugin._x_snapshot.stats(),
+            "scenarios": results,
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100, help="events per scenario")
+    parser.add_argument("--gap", type=float, default=0.12, help="seconds between events")
+    parser.add_argument("--transport", choices=("x11", "xprop"), default="x11")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON to PATH ('-' for stdout)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    for name, r in results["scenarios"].items():
+        if "p50_ms" in r:
+            print(f"{name:<11} p50 {r['p50_ms']:8.2f} ms  p99 {r['p99_ms']:8.2f} ms  "
+                  f"missed {r['missed']}  subprocesses {r['subprocesses']}  xprop runs {r['xprop_runs']}")
+        elif name == "jitter":
+            print(f"{name:<11} " + "  ".join(f"{band} {v['effect_writes']} writes / {v['events']} events"
+                                               for band, v in r.items()))
+        elif "new_ops_per_s" in r:
+            print(f"{name:<11} new {r['new_ops_per_s']:8.1f}/s  cached {r['cached_ops_per_s']:8.1f}/s")
+        else:
+            print(f"{name:<11} no samples, missed {r.get('missed')}")
+
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
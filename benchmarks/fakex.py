@@ -0,0 +1,108 @@
+"""
+Minimal X11 server on a unix socket, enough for XPropertyClient: connection
+setup, InternAtom, GetProperty, ChangeProperty, ChangeWindowAttributes,
+GetInputFocus and PropertyNotify events on the root window.
+"""
+import asyncio
+import struct
+
+ROOT = 0x100
+ATOM_CARDINAL = 6
+ATOM_UTF8_STRING = 0x1F0
+PROPERTY_CHANGE_MASK = 0x400000
+
+
+class FakeXServer:
+    def __init__(self, path: str):
+        self.path = path
+        self.atoms: dict[str, int] = {"CARDINAL": ATOM_CARDINAL, "UTF8_STRING": ATOM_UTF8_STRING}
+        self.props: dict[int, tuple[int, int, bytes]] = {}
+        self.requests = 0
+        self._clients: list[tuple[asyncio.StreamWriter, list[int]]] = []
+        self._server: asyncio.AbstractServer | None = None
+
+    def atom(self, name: str) -> int:
+        return self.atoms.setdefault(name, 0x200 + len(self.atoms))
+
+    def set_cardinal(self, name: str, value: int):
+        atom = self.atom(name)
+        self.props[atom] = (ATOM_CARDINAL, 32, struct.pack("<I", value))
+        self._notify(atom)
+
+    def get_string(self, name: str) -> str | None:
+        prop = self.props.get(self.atom(name))
+        return prop[2].decode("utf-8") if prop else None
+
+    async def start(self):
+        self._server = await asyncio.start_unix_server(self._client, self.path)
+
+    async def stop(self):
+        for w, _ in list(self._clients):
+            w.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _notify(self, atom: int):
+        for w, (mask, seq) in ((w, tuple(s)) for w, s in self._clients):
+            if mask & PROPERTY_CHANGE_MASK:
+                w.write(struct.pack("<BxHIIIB15x", 28, seq & 0xFFFF, ROOT, atom, 0, 0))
+
+    async def _client(self, r: asyncio.StreamReader, w: asyncio.StreamWriter):
+        _, _, _, n, d = struct.unpack("<BxHHHHxx", await r.readexactly(12))
+        await r.readexactly(n + (-n % 4) + d + (-d % 4))
+
+        vendor = b"fake"
+        body = struct.pack(
+            "<IIIIHHBBBBBBBBxxxx",
+            1, 0x200000, 0x1FFFFF, 0, len(vendor), 65535, 1, 0, 0, 0, 32, 32, 8, 255,
+        ) + vendor
+        body += b"\0" * (-len(body) % 4)
+        body += struct.pack(
+            "<IIIIIHHHHHHIBBBB",
+            ROOT, 0x20, 0xFFFFFF, 0, 0, 1280, 800, 300, 200, 1, 1, 0x21, 0, 0, 24, 0,
+        )
+        w.write(struct.pack("<BxHHH", 1, 11, 0, len(body) // 4) + body)
+
+        state = [0, 0]  # event mask, last sequence number
+        self._clients.append((w, state))
+        try:
+            while True:
+                op, _, length = struct.unpack("<BBH", await r.readexactly(4))
+                rest = await r.readexactly(length * 4 - 4)
+                state[1] = (state[1] + 1) & 0xFFFF
+                seq = state[1]
+                self.requests += 1
+                if op == 16:  # InternAtom
+                    (nlen,) = struct.unpack_from("<H", rest, 0)
+                    atom = self.atom(rest[4:4 + nlen].decode())
+                    w.write(struct.pack("<BxHII20x", 1, seq, 0, atom))
+                elif op == 20:  # GetProperty
+                    _, prop, _, _, _ = struct.unpack_from("<IIIII", rest, 0)
+                    value = self.props.get(prop)
+                    if value is None:
+                        w.write(struct.pack("<BBHIIII12x", 1, 0, seq, 0, 0, 0, 0))
+                    else:
+                        typ, fmt, data = value
+                        padded = data + b"\0" * (-len(data) % 4)
+                        w.write(struct.pack(
+                            "<BBHIIII12x", 1, fmt, seq, len(padded) // 4, typ, 0, len(data) // (fmt // 8)
+                        ) + padded)
+                elif op == 18:  # ChangeProperty
+                    _, prop, typ, fmt, count = struct.unpack_from("<IIIBxxxI", rest, 0)
+                    self.props[prop] = (typ, fmt, rest[20:20 + count * (fmt // 8)])
+                    self._notify(prop)
+                elif op == 2:  # ChangeWindowAttributes
+                    _, value_mask = struct.unpack_from("<II", rest, 0)
+                    if value_mask & 0x800:
+                        state[0] = struct.unpack_from("<I", rest, 8)[0]
+                elif op == 43:  # GetInputFocus
+                    w.write(struct.pack("<BBHII20x", 1, 0, seq, 0, 0))
+                else:
+                    w.write(struct.pack("<BBHIHB21x", 0, 1, seq, 0, 0, op))
+                await w.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients = [c for c in self._clients if c[0] is not w]
+            w.close()
@@ -0,0 +1,156 @@
+"""
+Throughput of the log matchers over a large synthetic console-linux.txt.
+
+The colorspace and OnScreenChanged routes are run over the same log three
+ways:
+  per_line  the previous path: split every chunk into lines, check the needle
+            per line, decode and regex-match lines that contain it
+  block     match_log_block() over whole newline-terminated read blocks
+  follower  LogMultiplexer + LogFollower end to end, from offset 0 to EOF
+Each reports lines/s, MB/s and CPU ms per MB read (process time).
+
+    python benchmarks/logbench.py [--size-mb 256] [--every 20000] [--log PATH] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+
+def load_main(root: str):
+    for name in ("settings", "runtime", "log"):
+        os.makedirs(os.path.join(root, name), exist_ok=True)
+    os.environ["DECKY_PLUGIN_SETTINGS_DIR"] = os.path.join(root, "settings")
+    os.environ["DECKY_PLUGIN_RUNTIME_DIR"] = os.path.join(root, "runtime")
+    os.environ["DECKY_PLUGIN_LOG_DIR"] = os.path.join(root, "log")
+    # Decky puts py_modules on the path of the plugin process
+    sys.path[:0] = [os.path.join(BENCH_DIR, "stubs"), REPO_DIR, os.path.join(REPO_DIR, "py_modules")]
+    import logs
+    import main
+    return main, logs
+
+
+def read_blocks(path: str, chunk_size: int):
+    """Whole-line blocks, cut the way LogFollower cuts them."""
+    partial = b""
+    with open(path, "rb") as f:
+        while data := f.read(chunk_size):
+            cut = data.rfind(b"\n") + 1
+            if not cut:
+                partial += data
+                continue
+            yield partial + data[:cut] if partial else data[:cut]
+            partial = data[cut:]
+
+
+def per_line(path: str, routes, chunk_size: int) -> int:
+    compiled = [(needle, re.compile(pattern.pattern.decode())) for needle, pattern in routes]
+    matched = 0
+    partial = b""
+    with open(path, "rb") as f:
+        while data := f.read(chunk_size):
+            parts = (partial + data).split(b"\n")
+            partial = parts.pop()
+            for line in parts:
+                for needle, pattern in compiled:
+                    if needle in line and pattern.search(line.decode("utf-8", "ignore").rstrip()):
+                        matched += 1
+    return matched
+
+
+def block(logs, path: str, routes, chunk_size: int) -> int:
+    table = [logs._LogRoute(name, (path,), needle, pattern, None)
+             for name, (needle, pattern) in zip(("colorspace", "screen"), routes)]
+    return sum(len(logs.match_log_block(table, data)) for data in read_blocks(path, chunk_size))
+
+
+async def follower(logs, path: str, routes) -> int:
+    size = os.path.getsize(path)
+    offsets = {path: [os.stat(path).st_ino, 0]}
+    matched = 0
+
+    async def handler(m):
+        nonlocal matched
+        matched += 1
+
+    mux = logs.LogMultiplexer([path], offsets)
+    for name, (needle, pattern) in zip(("colorspace", "screen"), routes):
+        mux.register(name, [path], needle, pattern, handler)
+    # offsets only move once a block has been handled, so wait for EOF there
+    while offsets[path][1] < size:
+        await asyncio.sleep(0.005)
+    for name in ("colorspace", "screen"):
+        mux.unregister(name)
+    return matched
+
+
+def measure(label: str, run, size: int, lines: int) -> dict:
+    wall, cpu = time.perf_counter(), time.process_time()
+    matched = run()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    mb = size / 1048576
+    return {
+        "mode": label,
+        "matched": matched,
+        "wall_s": round(wall, 3),
+        "lines_per_s": round(lines / wall),
+        "mb_per_s": round(mb / wall, 1),
+        "cpu_ms_per_mb": round(cpu * 1000.0 / mb, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=256)
+    parser.add_argument("--every", type=int, default=20000, help="lines between matcher events")
+    parser.add_argument("--log", metavar="PATH", help="use an existing log instead of generating one")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON to PATH ('-' for stdout)")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="muradeck-logbench-")
+    try:
+        plugin, logs = load_main(root)
+        from loggen import generate
+
+        path = args.log
+        if path is None:
+            path = os.path.join(root, "console-linux.txt")
+            generate(path, args.size_mb, args.every)
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+
+        routes = [(b"colorspace:", plugin.RE_COLORSPACE), (b"OnScreenChanged", plugin.RE_SCREEN_CHANGED)]
+        chunk = logs.LOG_CHUNK_SIZE
+        results = [
+            measure("per_line", lambda: per_line(path, routes, chunk), size, lines),
+            measure("block", lambda: block(logs, path, routes, chunk), size, lines),
+            measure("follower", lambda: asyncio.run(follower(logs, path, routes)), size, lines),
+        ]
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{size / 1048576:.1f} MB, {lines} lines")
+    for r in results:
+        print(f"{r['mode']:<9} {r['lines_per_s']:>11,} lines/s  {r['mb_per_s']:>8.1f} MB/s  "
+              f"{r['cpu_ms_per_mb']:>8.3f} CPU ms/MB  matched {r['matched']}")
+
+    out = {"bytes": size, "lines": lines, "results": results}
+    if args.json == "-":
+        json.dump(out, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(out, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
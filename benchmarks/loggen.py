@@ -0,0 +1,92 @@
+"""
+Synthetic Steam `console-linux.txt` generator.
+
+Writes a log of the requested size with a line mix close to a real gaming
+session: mostly Steam client and gamescope chatter, some long shader cache
+and HTTP lines, a few lines with invalid UTF-8, and every `--every` lines a
+gamescope colorspace switch or an OnScreenChanged monitor event.
+
+    python benchmarks/loggen.py out.txt [--size-mb 256] [--every 20000] [--seed 1]
+"""
+import argparse
+import random
+import time
+
+CHATTER = (
+    "[{ts}] CAPIJobRequestUserStats - Server response failed 2",
+    "[{ts}] ExecCommandLine: \"'/home/deck/.local/share/Steam/ubuntu12_32/steam' -steamdeck -gamepadui\"",
+    "[{ts}] Game process updated : AppID {appid} \"/home/deck/.local/share/Steam/steamapps/common/Game/game.exe\", ProcID {pid}",
+    "[{ts}] GameAction [AppID {appid}, ActionID 1] : LaunchApp changed task to WaitingGameWindow with \"\"",
+    "[gamescope] [Info]  xwm: got the same buffer committed twice, ignoring.",
+    "[gamescope] [Info]  wlserver: [backend/libinput/events.c:{pid}] Unsupported event type 7",
+    "[gamescope] [Warn]  vblank: late by {pid}us",
+    "pressure-vessel-wrap[{pid}]: W: Not replacing \"/usr/lib/pressure-vessel/overrides/lib/x86_64-linux-gnu\"",
+    "fsync: up and running.",
+    "src/steamexe/updateui_xpm.cpp (359) : Assertion Failed: m_hWnd",
+    "ThreadGetAppIDsFromGameID: no appid for gameid {pid}",
+    "[{ts}] Steam Input Controller Configuration loaded for {appid}",
+)
+
+LONG = (
+    "[{ts}] Shader cache: compiled {pid} pipelines for {appid}, foz db "
+    "/home/deck/.local/share/Steam/steamapps/shadercache/{appid}/fozpipelinesv6/steamapprun_pipeline_cache.foz "
+    "size {pid}KB, replay {pid}ms, " + "x" * 120,
+    "[{ts}] HTTP (SingleStream) - https://api.steampowered.com/ICloudService/SignalAppLaunchIntent/v1 "
+    "?access_token=" + "A" * 160 + " result 200",
+)
+
+EVENTS = (
+    "[gamescope] [Info]  xdg_backend: colorspace: {cs}",
+    "[{ts}] OnScreenChanged: gamescope event external: {ext}",
+)
+
+COLORSPACES = ("HDR10_ST2084", "SRGB_NONLINEAR", "SRGB_LINEAR")
+INVALID = b"[gamescope] [Error] drm: bad EDID block \xff\xfe\x80 name \xc3\x28\n"
+
+
+def generate(path: str, size_mb: float, every: int, seed: int = 1) -> dict:
+    """Write the log, returns counts of the lines written."""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    written = lines = colorspace = screen = 0
+    ts = time.strftime("%Y-%m-%d %H:%M:%S")
+    with open(path, "wb") as f:
+        batch = []
+        while written < target:
+            lines += 1
+            if lines % every == 0:
+                if (lines // every) % 2:
+                    line = EVENTS[0].format(cs=rng.choice(COLORSPACES)).encode() + b"\n"
+                    colorspace += 1
+                else:
+                    line = EVENTS[1].format(ts=ts, ext=rng.randint(0, 1)).encode() + b"\n"
+                    screen += 1
+            elif lines % 997 == 0:
+                line = INVALID
+            else:
+                pool = LONG if rng.random() < 0.05 else CHATTER
+                fields = {"ts": ts, "appid": rng.randint(10, 2_500_000), "pid": rng.randint(100, 99999)}
+                line = rng.choice(pool).format(**fields).encode() + b"\n"
+            batch.append(line)
+            written += len(line)
+            if len(batch) >= 4096:
+                f.write(b"".join(batch))
+                batch.clear()
+        f.write(b"".join(batch))
+    return {"bytes": written, "lines": lines, "colorspace": colorspace, "screen": screen}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--size-mb", type=float, default=256)
+    parser.add_argument("--every", type=int, default=20000, help="lines between matcher events")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    counts = generate(args.path, args.size_mb, args.every, args.seed)
+    print(f"{counts['bytes'] / 1048576:.1f} MB, {counts['lines']} lines, "
+          f"{counts['colorspace']} colorspace, {counts['screen']} screen events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Check png_read_channel() against an independent PNG encoder.
+
+Random images of every supported color type are encoded with a random
+filter per row (None, Sub, Up, Average, Paeth, filtered over whole pixels
+as the spec does) and each channel read back must match the source
+samples. png_encode_rg() output is read back the same way.
+
+Real files are checked against a plain reference decoder: the PNG shipped
+in assets/ (multi-IDAT, ancillary chunks, written by an image editor), a
+pack_mura_textures() run on mura-sized planes cut from it, and the mura
+maps found on the device (or in --maps) together with their packed texture.
+
+    python benchmarks/pngcheck.py [--images 200] [--seed 1] [--maps DIR]
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+import tempfile
+import zlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+SHIPPED_PNG = os.path.join(REPO_DIR, "assets", "Markdown", "Ground Truth.png")
+SHIPPED_ROWS = 64
+
+
+def load_main(root: str):
+    for name in ("settings", "runtime", "log"):
+        os.makedirs(os.path.join(root, name), exist_ok=True)
+    os.environ["DECKY_PLUGIN_SETTINGS_DIR"] = os.path.join(root, "settings")
+    os.environ["DECKY_PLUGIN_RUNTIME_DIR"] = os.path.join(root, "runtime")
+    os.environ["DECKY_PLUGIN_LOG_DIR"] = os.path.join(root, "log")
+    # Decky puts py_modules on the path of the plugin process
+    sys.path[:0] = [os.path.join(BENCH_DIR, "stubs"), REPO_DIR, os.path.join(REPO_DIR, "py_modules")]
+    import main
+    return main
+
+
+def paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def filter_row(ftype: int, row: bytes, prev: bytes, bpp: int) -> bytes:
+    out = bytearray(len(row))
+    for i, x in enumerate(row):
+        a = row[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        c = prev[i - bpp] if i >= bpp else 0
+        predictor = (0, a, b, (a + b) >> 1, paeth(a, b, c))[ftype]
+        out[i] = (x - predictor) & 0xFF
+    return bytes([ftype]) + out
+
+
+def encode(width: int, height: int, color: int, pixels: bytes, rng: random.Random) -> bytes:
+    bpp = {0: 1, 2: 3, 4: 2, 6: 4}[color]
+    stride = width * bpp
+    raw = bytearray()
+    prev = bytes(stride)
+    for y in range(height):
+        row = pixels[y * stride:(y + 1) * stride]
+        raw += filter_row(rng.randrange(5), row, prev, bpp)
+        prev = row
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    # IDAT split in two to cover multi-chunk streams
+    data = zlib.compress(bytes(raw))
+    half = len(data) // 2
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color, 0, 0, 0))
+        + chunk(b"IDAT", data[:half])
+        + chunk(b"IDAT", data[half:])
+        + chunk(b"IEND", b"")
+    )
+
+
+def decode(data: bytes, rows: int | None = None, columns: int | None = None) -> tuple[int, int, int, bytes]:
+    """Width, height, color type and the top-left `rows` x `columns` pixels, unfiltered byte by byte."""
+    pos, header, idat = 8, None, []
+    while pos < len(data):
+        length, kind = struct.unpack_from(">I4s", data, pos)
+        if kind == b"IHDR":
+            header = struct.unpack_from(">IIBBBBB", data, pos + 8)
+        elif kind == b"IDAT":
+            idat.append(data[pos + 8:pos + 8 + length])
+        pos += 12 + length
+    width, height, depth, color, _, _, interlace = header
+    assert depth == 8 and not interlace
+    bpp = {0: 1, 2: 3, 4: 2, 6: 4}[color]
+    stride = width * bpp
+    rows = height if rows is None else min(rows, height)
+    # Filters only look left and up, so a crop unfilters on its own
+    span = stride if columns is None else min(columns, width) * bpp
+    raw = zlib.decompressobj().decompress(b"".join(idat), (stride + 1) * rows)
+    pixels = bytearray()
+    prev = bytes(span)
+    for y in range(rows):
+        ftype, line = raw[y * (stride + 1)], raw[y * (stride + 1) + 1:y * (stride + 1) + 1 + span]
+        row = bytearray(span)
+        for i in range(span):
+            a = row[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            c = prev[i - bpp] if i >= bpp else 0
+            row[i] = (line[i] + (0, a, b, (a + b) >> 1, paeth(a, b, c))[ftype]) & 0xFF
+        pixels += row
+        prev = row
+    return width, height, color, bytes(pixels)
+
+
+def check_file(plugin, path: str, rows: int | None = None) -> int:
+    """Compare every channel png_read_channel() returns for `path` with decode()."""
+    with open(path, "rb") as f:
+        width, height, color, pixels = decode(f.read(), rows)
+    bpp = {0: 1, 2: 3, 4: 2, 6: 4}[color]
+    failures = 0
+    for channel in range(3):
+        source = channel if color in (2, 6) else 0
+        got_w, got_h, got = plugin.png_read_channel(path, channel)
+        if (got_w, got_h) != (width, height) or got[:len(pixels) // bpp] != pixels[source::bpp]:
+            failures += 1
+            print(f"{os.path.basename(path)}: channel {channel} differs from the reference decoder")
+    return failures
+
+
+def check_pack(plugin, red: str, green: str, out: str) -> int:
+    """pack_mura_textures() output must hold red's R and green's G, decoded independently."""
+    with open(out, "wb") as f:
+        f.write(plugin.pack_mura_textures(red, green))
+    planes = []
+    for path, channel in ((red, 0), (green, 1)):
+        with open(path, "rb") as f:
+            _, _, color, pixels = decode(f.read())
+        bpp = {0: 1, 2: 3, 4: 2, 6: 4}[color]
+        planes.append(pixels[(channel if color in (2, 6) else 0)::bpp])
+    with open(out, "rb") as f:
+        width, height, color, pixels = decode(f.read())
+    failures = 0
+    if (width, height, color) != (*plugin.MURA_TEXTURE_SIZE, 2):
+        failures += 1
+        print(f"packed texture is {width}x{height} color type {color}")
+    for name, channel, expected in (("red", 0, planes[0]), ("green", 1, planes[1]), ("blue", 2, bytes(len(planes[0])))):
+        if pixels[channel::3] != expected:
+            failures += 1
+            print(f"packed texture from {os.path.basename(red)}, {os.path.basename(green)}: {name} differs")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--maps", metavar="DIR", help="red.png and green.png to check instead of the device's")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix="muradeck-png-") as root:
+        plugin = load_main(root)
+        path = os.path.join(root, "t.png")
+
+        for n in range(args.images):
+            color = rng.choice((0, 2, 4, 6))
+            bpp = {0: 1, 2: 3, 4: 2, 6: 4}[color]
+            width, height = rng.randint(1, 40), rng.randint(1, 40)
+            pixels = bytes(rng.randrange(256) for _ in range(width * height * bpp))
+            with open(path, "wb") as f:
+                f.write(encode(width, height, color, pixels, rng))
+            for channel in range(3):
+                source = channel if color in (2, 6) else 0
+                expected = pixels[source::bpp]
+                got = plugin.png_read_channel(path, channel)
+                if got != (width, height, expected):
+                    failures += 1
+                    print(f"image {n}: color type {color} {width}x{height} channel {channel} differs")
+
+        for n in range(20):
+            width, height = rng.randint(1, 64), rng.randint(1, 64)
+            red = bytes(rng.randrange(256) for _ in range(width * height))
+            green = bytes(rng.randrange(256) for _ in range(width * height))
+            with open(path, "wb") as f:
+                f.write(plugin.png_encode_rg(width, height, red, green))
+            for channel, expected in ((0, red), (1, green), (2, bytes(width * height))):
+                if plugin.png_read_channel(path, channel) != (width, height, expected):
+                    failures += 1
+                    print(f"png_encode_rg {n}: {width}x{height} channel {channel} differs")
+
+        # A file from a real encoder, the first rows are enough to cover its
+        # filters and the IDAT boundaries are skipped over by the decoders
+        failures += check_file(plugin, SHIPPED_PNG, SHIPPED_ROWS)
+
+        # Real image content at mura size: grey red map, RGB green map
+        width, height = plugin.MURA_TEXTURE_SIZE
+        with open(SHIPPED_PNG, "rb") as f:
+            _, _, _, rgb = decode(f.read(), height, width)
+        red, green = os.path.join(root, "red.png"), os.path.join(root, "green.png")
+        with open(red, "wb") as f:
+            f.write(encode(width, height, 0, rgb[0::3], rng))
+        with open(green, "wb") as f:
+            f.write(encode(width, height, 2, rgb, rng))
+        failures += check_pack(plugin, red, green, os.path.join(root, "mura.png"))
+
+        if args.maps:
+            maps = {name: os.path.join(args.maps, name) for name in plugin.MURA_TEXTURE_FILES}
+        else:
+            maps = plugin._find_mura_maps()
+        if len(maps) == len(plugin.MURA_TEXTURE_FILES):
+            for path in maps.values():
+                failures += check_file(plugin, path)
+            failures += check_pack(plugin, maps["red.png"], maps["green.png"], os.path.join(root, "mura.png"))
+            real = "mura maps checked"
+        else:
+            real = "no mura maps found"
+
+    print(f"{args.images} filtered images, 20 packed images, {SHIPPED_ROWS} rows of {os.path.basename(SHIPPED_PNG)}, "
+          f"{real}, {failures} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Stand-in for the `decky` module Decky Loader injects, see decky.pyi."""
+import logging
+import os
+import sys
+from typing import Any
+
+HOME: str = os.environ.get("HOME", "")
+USER: str = os.environ.get("USER", "deck")
+DECKY_VERSION: str = "bench"
+DECKY_USER: str = USER
+DECKY_USER_HOME: str = HOME
+DECKY_HOME: str = os.path.join(HOME, "homebrew")
+DECKY_PLUGIN_SETTINGS_DIR: str = os.environ.get("DECKY_PLUGIN_SETTINGS_DIR", "")
+DECKY_PLUGIN_RUNTIME_DIR: str = os.environ.get("DECKY_PLUGIN_RUNTIME_DIR", "")
+DECKY_PLUGIN_LOG_DIR: str = os.environ.get("DECKY_PLUGIN_LOG_DIR", "")
+DECKY_PLUGIN_DIR: str = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DECKY_PLUGIN_NAME: str = "MuraDeck"
+DECKY_PLUGIN_VERSION: str = "bench"
+DECKY_PLUGIN_AUTHOR: str = "bench"
+DECKY_PLUGIN_LOG: str = os.path.join(DECKY_PLUGIN_LOG_DIR, "plugin.log")
+
+logger: logging.Logger = logging.getLogger("MuraDeck")
+logger.addHandler(logging.StreamHandler(sys.stderr))
+logger.setLevel(logging.WARNING)
+
+# Every emit(), for the harness to inspect
+events: list[tuple[str, tuple]] = []
+
+
+def migrate_any(target_dir: str, *files_or_directories: str) -> dict[str, str]:
+    return {}
+
+
+def migrate_settings(*files_or_directories: str) -> dict[str, str]:
+    return {}
+
+
+def migrate_runtime(*files_or_directories: str) -> dict[str, str]:
+    return {}
+
+
+def migrate_logs(*files_or_directories: str) -> dict[str, str]:
+    return {}
+
+
+async def emit(event: str, *args: Any) -> None:
+    events.append((event, args))
@@ -0,0 +1,29 @@
+"""Stand-in for Decky Loader's settings.SettingsManager, counting commits."""
+import json
+import os
+
+
+class SettingsManager:
+    def __init__(self, name: str, settings_directory: str | None = None):
+        self.path = os.path.join(settings_directory or os.getcwd(), f"{name}.json")
+        self.settings: dict = {}
+        self.commits = 0
+
+    def read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.settings = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.settings = {}
+
+    def commit(self):
+        self.commits += 1
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.settings, f, indent=4, ensure_ascii=False)
+
+    def getSetting(self, key: str, default=None):
+        return self.settings.get(key, default)
+
+    def setSetting(self, key: str, value):
+        self.settings[key] = value
+        return value
@@ -3,13 +3,31 @@ import subprocess
 import re
 import decky
 import asyncio
-import shutil
 import glob
-import base64
+import json
+import hashlib
+import time
+import struct
+import zlib
+import threading
+import bisect
+import contextvars
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import NamedTuple
 from decky import emit
 
 from settings import SettingsManager
 
+from caches import ShaderVariantCache, SteamIconCache, _atomic_write
+from logs import LogMultiplexer, scan_log_backwards
+from x11 import PropertySnapshot, XPropertyClient, XpropHelper
+
+# Reference point of the startup report, as close to plugin load as we get
+LOADED_AT = time.perf_counter()
+
 settings = SettingsManager(
     name="settings",
     settings_directory=os.environ["DECKY_PLUGIN_SETTINGS_DIR"],
@@ -20,6 +38,7 @@ RESHADE_DIR = os.path.expanduser("~/.local/share/gamescope/reshade")
 SHADER_DIR = os.path.join(RESHADE_DIR, "Shaders")
 TEXTURE_DIR = os.path.join(RESHADE_DIR, "Textures")
 MURA_TMP_DIR = "/tmp/mura"
+MURA_CONFIG_DIR = os.path.expanduser("~/.config/gamescope/mura")
 
 PLUGIN_SHADERS_DIR = os.path.join(os.path.dirname(__file__), "shaders")
 
@@ -37,12 +56,34 @@ MURA_TEXTURE_FILES = [
     "red.png",
 ]
 
+# Red map in R, green map in G, so the shaders fetch one texel instead of two
+MURA_PACKED_TEXTURE = "mura.png"
+MURA_TEXTURE_SIZE = (1280, 800)
+RE_MURA_TEXTURES = re.compile(
+    r"texture red_tex <[^>]*> \{[^}]*\};\s*texture green_tex <[^>]*> \{[^}]*\};\s*"
+    r"sampler red_s \{[^}]*\};\s*sampler green_s \{[^}]*\};"
+)
+RE_MURA_SAMPLES = re.compile(
+    r"^([ \t]*)float3 red = tex2D\(red_s, (\w+)\)\.rgb;\n[ \t]*float3 green = tex2D\(green_s, \2\)\.rgb;",
+    re.MULTILINE,
+)
+
 STEAM_ICON_PATH = os.path.expanduser("~/.steam/steam/appcache/librarycache")
 
 LOG_DIR = os.path.expanduser("~/.steam/steam/logs")
 LOG_LINUX = os.path.join(LOG_DIR, "console-linux.txt")
 LOG_GAMEPROC = os.path.join(LOG_DIR, "gameprocess_log.txt")
 LOG_DISPLAYMGR = os.path.join(LOG_DIR, "systemdisplaymanager.txt")
+LOG_OFFSET_SAVE_INTERVAL = 30.0
+
+# Matched against raw log bytes, only the captured group is ever decoded
+RE_COLORSPACE = re.compile(rb"colorspace:.*(HDR10_ST2084|SRGB_NONLINEAR|SRGB_LINEAR)")
+RE_SCREEN_CHANGED = re.compile(rb"OnScreenChanged:[ \t]+gamescope event external: (\d)")
+COLORSPACE_PROFILES = {"HDR10_ST2084": "HDR10PQ", "SRGB_LINEAR": "HDRscRGB"}
+
+X_PROP_FOCUSED_APP = "GAMESCOPE_FOCUSED_APP"
+X_PROP_HDR_FEEDBACK = "GAMESCOPE_COLOR_APP_WANTS_HDR_FEEDBACK"
+X_WATCH_SETTLE = 0.05
 
 FX_DIR = os.path.expanduser("~/.local/share/gamescope/reshade/Shaders")
 FX_CAS = "CAS.fx"
@@ -82,6 +123,830 @@ BRIGHTNESS_TABLE_HDRscRGB = [
     (0,  0.0175),
 ]
 
+BRIGHTNESS_HYSTERESIS = 2
+
+
+class BrightnessLUT:
+    """A BRIGHTNESS_TABLE_* as a 0-100 array of rows, with hysteresis around the held row."""
+
+    def __init__(self, table):
+        self.levels: list[tuple[float, float | None]] = []
+        self.bounds: list[tuple[int, int]] = []
+        upper = 100
+        for thr, map_s, *fade in table:
+            level = (map_s, fade[0] if fade else None)
+            if self.levels and self.levels[-1] == level:
+                self.bounds[-1] = (thr, self.bounds[-1][1])
+            else:
+                self.levels.append(level)
+                self.bounds.append((thr, upper))
+            upper = thr
+        # Rows match on brightness > threshold, 0 % matches none
+        self.rows: list[int | None] = [
+            next((i for i, (lo, _) in enumerate(self.bounds) if b > lo), None)
+            for b in range(101)
+        ]
+
+    def row_for(self, brightness: int) -> int | None:
+        return self.rows[min(100, max(0, int(round(brightness))))]
+
+    def lookup(self, brightness: int, held: int | None = None, hysteresis: int = 0) -> int | None:
+        row = self.row_for(brightness)
+        if held is not None and row != held:
+            lo, hi = self.bounds[held]
+            if lo - hysteresis < brightness <= hi + hysteresis:
+                return held
+        return row
+
+
+BRIGHTNESS_LUTS = {
+    "SDR": BrightnessLUT(BRIGHTNESS_TABLE_SDR),
+    "HDR10PQ": BrightnessLUT(BRIGHTNESS_TABLE_HDR10PQ),
+    "HDRscRGB": BrightnessLUT(BRIGHTNESS_TABLE_HDRscRGB),
+}
+
+# Uniforms rewritten by the plugin, with their declared ReShade type
+FX_UNIFORM_SLOTS = {
+    "CAS_Enabled": "float",
+    "Sharpness": "float",
+    "MuraMapScale": "float",
+    "MuraFadeNearWhite": "float",
+    "Intensity": "float",
+    "RGB_Lift": "float3",
+    "RGB_Gamma": "float3",
+}
+
+RE_FX_UNIFORM = re.compile(r"^\s*uniform\s+(float3?)\s+(\w+)\s*<")
+RE_FX_UNIFORM_VALUE = re.compile(r">\s*=\s*(.*?)\s*;")
+
+
+class FxTemplate:
+    """Shader source split into literal chunks and uniform value slots."""
+
+    def __init__(self, path: str, stamp: tuple[int, int, int], text: str):
+        self.path = path
+        self.stamp = stamp
+        self.chunks: list[str] = []
+        self.slots: dict[str, int] = {}
+        self.types: dict[str, str] = {}
+        self.values: dict[str, object] = {}
+        # Slots whose `>` shares the declaration line: text around the value
+        self.inline: dict[str, tuple[str, str]] = {}
+
+        lines = text.splitlines(keepends=True)
+        literal: list[str] = []
+        i = 0
+        while i < len(lines):
+            m = RE_FX_UNIFORM.match(lines[i])
+            if not m or FX_UNIFORM_SLOTS.get(m.group(2)) != m.group(1):
+                literal.append(lines[i])
+                i += 1
+                continue
+
+            name = m.group(2)
+            declaration = i
+            while i < len(lines) and ">" not in lines[i]:
+                literal.append(lines[i])
+                i += 1
+            if i == len(lines):
+                break
+
+            value = RE_FX_UNIFORM_VALUE.search(lines[i])
+            if i == declaration:
+                if not value:
+                    literal.append(lines[i])
+                    i += 1
+                    continue
+                self.inline[name] = (lines[i][:value.start(1)], lines[i][value.end(1):])
+            self.chunks.append("".join(literal))
+            literal = []
+            self.slots[name] = len(self.chunks)
+            self.types[name] = m.group(1)
+            self.values[name] = value.group(1) if value else None
+            self.chunks.append(lines[i])
+            i += 1
+
+        self.chunks.append("".join(literal))
+
+    def render(self, **values) -> str:
+        # Overrides stay local, renders of one template may run concurrently
+        current = dict(self.values)
+        for name, value in values.items():
+            if value is not None and name in self.slots:
+                current[name] = value
+
+        parts = self.chunks.copy()
+        for name, idx in self.slots.items():
+            if name in self.inline:
+                head, tail = self.inline[name]
+                parts[idx] = f"{head}{current[name]}{tail}"
+            else:
+                parts[idx] = f"> = {current[name]};\n"
+        return "".join(parts)
+
+
+_fx_templates: dict[str, FxTemplate] = {}
+
+
+def _fx_stamp(st: os.stat_result) -> tuple[int, int, int]:
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def load_fx_template(path: str) -> FxTemplate:
+    """Return the cached template for `path`, re-parsing only if it changed on disk."""
+    stamp = _fx_stamp(os.stat(path))
+    template = _fx_templates.get(path)
+    if template is None or template.stamp != stamp:
+        with open(path, "r") as f:
+            template = FxTemplate(path, stamp, f.read())
+        _fx_templates[path] = template
+    return template
+
+
+# Two physical files per effect, alternated to force a reload of the same state
+FX_RELOAD_SLOTS = ("a", "b")
+
+IO_WORKERS = 2
+IO_MAX_PENDING = 32
+
+
+def _summarize_ms(samples) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        "max_ms": ordered[-1],
+    }
+
+
+def _atomic_copy(src: str, dst: str, mode: int = 0o644):
+    with open(src, "rb") as f:
+        _atomic_write(dst, f.read(), mode)
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+
+
+def _png_unfilter(ftype: int, cur: bytearray, prev):
+    """Undo one PNG row filter in place, for a single channel of samples."""
+    n = len(cur)
+    if ftype == 0:
+        return
+    if ftype == 1:
+        for i in range(1, n):
+            cur[i] = (cur[i] + cur[i - 1]) & 0xFF
+    elif ftype == 2:
+        for i in range(n):
+            cur[i] = (cur[i] + prev[i]) & 0xFF
+    elif ftype == 3:
+        cur[0] = (cur[0] + (prev[0] >> 1)) & 0xFF
+        for i in range(1, n):
+            cur[i] = (cur[i] + ((cur[i - 1] + prev[i]) >> 1)) & 0xFF
+    elif ftype == 4:
+        cur[0] = (cur[0] + prev[0]) & 0xFF
+        for i in range(1, n):
+            a, b, c = cur[i - 1], prev[i], prev[i - 1]
+            pa, pb, pc = abs(b - c), abs(a - c), abs(a + b - 2 * c)
+            if pa <= pb and pa <= pc:
+                cur[i] = (cur[i] + a) & 0xFF
+            elif pb <= pc:
+                cur[i] = (cur[i] + b) & 0xFF
+            else:
+                cur[i] = (cur[i] + c) & 0xFF
+    else:
+        raise ValueError(f"bad PNG filter type {ftype}")
+
+
+def png_read_channel(path: str, channel: int) -> tuple[int, int, bytes]:
+    """Decode one channel of an 8-bit, non-interlaced PNG as width * height bytes."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError(f"{path} is not a PNG")
+
+    header = None
+    idat = []
+    pos = 8
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack_from(">I4s", data, pos)
+        body = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif kind == b"IDAT":
+            idat.append(body)
+        elif kind == b"IEND":
+            break
+    if header is None:
+        raise ValueError(f"{path} has no IHDR")
+
+    width, height, depth, color, _, _, interlace = header
+    if depth != 8 or color not in PNG_CHANNELS or interlace:
+        raise ValueError(f"{path}: unsupported PNG (depth {depth}, color type {color}, interlace {interlace})")
+    bpp = PNG_CHANNELS[color]
+    if color in (0, 4):
+        channel = 0  # grey is every color channel
+    raw = zlib.decompress(b"".join(idat))
+    stride = width * bpp
+    if len(raw) < (stride + 1) * height:
+        raise ValueError(f"{path}: truncated image data")
+
+    out = bytearray(width * height)
+    prev = bytes(width)
+    for y in range(height):
+        start = y * (stride + 1)
+        cur = bytearray(raw[start + 1 + channel:start + 1 + stride:bpp])
+        _png_unfilter(raw[start], cur, prev)
+        out[y * width:(y + 1) * width] = cur
+        prev = cur
+    return width, height, bytes(out)
+
+
+def png_encode_rg(width: int, height: int, red: bytes, green: bytes) -> bytes:
+    """8-bit RGB PNG with R and G taken from two planes and B left at zero."""
+    rows = bytearray()
+    row = bytearray(width * 3)
+    for y in range(height):
+        row[0::3] = red[y * width:(y + 1) * width]
+        row[1::3] = green[y * width:(y + 1) * width]
+        rows += b"\0" + row
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    return (
+        PNG_SIGNATURE
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(bytes(rows), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def pack_mura_textures(red_path: str, green_path: str) -> bytes:
+    """The packed mura texture as PNG bytes, both maps must be MURA_TEXTURE_SIZE."""
+    rw, rh, red = png_read_channel(red_path, 0)
+    gw, gh, green = png_read_channel(green_path, 1)
+    for name, size in (("red", (rw, rh)), ("green", (gw, gh))):
+        if size != MURA_TEXTURE_SIZE:
+            raise ValueError(
+                f"{name} map is {size[0]}x{size[1]}, expected {MURA_TEXTURE_SIZE[0]}x{MURA_TEXTURE_SIZE[1]}"
+            )
+    return png_encode_rg(rw, rh, red, green)
+
+
+def pack_mura_shader(text: str) -> str | None:
+    """Rewrite a MuraDeck shader to sample the packed texture, None if it doesn't match."""
+    width, height = MURA_TEXTURE_SIZE
+    text, textures = RE_MURA_TEXTURES.subn(
+        f'texture mura_tex < source = "{MURA_PACKED_TEXTURE}"; > '
+        f"{{ Width = {width}; Height = {height}; Format = RGBA8; }};\n\n"
+        "sampler mura_s { Texture = mura_tex; };",
+        text,
+    )
+    text, samples = RE_MURA_SAMPLES.subn(
+        r"\1float3 mura = tex2D(mura_s, \2).rgb;\n"
+        r"\1float3 red = mura;\n"
+        r"\1float3 green = mura;",
+        text,
+    )
+    if textures != 1 or samples != 1:
+        return None
+    return text
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _source_key(path: str) -> list:
+    st = os.stat(path)
+    return [path, st.st_size, st.st_mtime_ns]
+
+
+def _shader_bytes(src: str, packed: bool) -> bytes:
+    """Shader source to install, switched to the packed texture when possible."""
+    data = _read_bytes(src)
+    if packed and os.path.basename(src).startswith("MuraDeck_"):
+        text = pack_mura_shader(data.decode("utf-8"))
+        if text is not None:
+            return text.encode("utf-8")
+    return data
+
+
+def _find_mura_maps() -> dict[str, str]:
+    """Source of each mura map, a complete set in MURA_CONFIG_DIR wins over MURA_TMP_DIR."""
+    maps = {}
+    for name in MURA_TEXTURE_FILES:
+        found = glob.glob(os.path.join(MURA_TMP_DIR, f"*{name}"))
+        if found:
+            maps[name] = found[0]
+    for candidate in glob.glob(os.path.join(MURA_CONFIG_DIR, "*")):
+        found = {name: glob.glob(os.path.join(candidate, f"*{name}")) for name in MURA_TEXTURE_FILES}
+        if all(found.values()):
+            return {name: paths[0] for name, paths in found.items()}
+    return maps
+
+
+INSTALL_MANIFEST_FILE = "install_manifest.json"
+
+
+class InstallManifest:
+    """Hash, stat and input key of each installed file, to skip unchanged install steps."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[str, dict] | None = None
+        self.written = 0
+        self.unchanged = 0
+        # install() runs on several I/O threads at once
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            self.entries = entries if isinstance(entries, dict) else None
+        except FileNotFoundError:
+            self.entries = None
+        except (OSError, ValueError) as e:
+            decky.logger.warning(f"[MuraDeck] Install manifest unreadable, rebuilding: {e}")
+            self.entries = None
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            data = json.dumps(self.entries or {}, sort_keys=True).encode("utf-8")
+        _atomic_write(self.path, data)
+
+    def clear(self):
+        self.entries = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _fresh(self, dst: str, key: list) -> bool:
+        with self._lock:
+            entry = (self.entries or {}).get(dst)
+        if entry is None or entry.get("key") != key:
+            return False
+        try:
+            st = os.stat(dst)
+        except OSError:
+            return False
+        return entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+
+    def install(self, dst: str, key: list, produce) -> bool:
+        """Bring `dst` up to date with `produce()`, True when it had to be written."""
+        if self._fresh(dst, key):
+            with self._lock:
+                self.unchanged += 1
+            return False
+        data = produce()
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            same = hashlib.sha256(_read_bytes(dst)).hexdigest() == digest
+        except FileNotFoundError:
+            same = False
+        if not same:
+            _atomic_write(dst, data)
+        st = os.stat(dst)
+        with self._lock:
+            if self.entries is None:
+                self.entries = {}
+            self.entries[dst] = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "key": key}
+            if same:
+                self.unchanged += 1
+            else:
+                self.written += 1
+        return not same
+
+    def copy(self, src: str, dst: str) -> bool:
+        return self.install(dst, _source_key(src), lambda: _read_bytes(src))
+
+    def installed(self, paths) -> bool:
+        """All of `paths` installed; only paths the manifest doesn't know are stat'ed."""
+        entries = self.entries or {}
+        return all(p in entries or os.path.exists(p) for p in paths)
+
+
+def _install_shader(manifest: InstallManifest, src: str, dst: str, packed: bool) -> bool:
+    return manifest.install(dst, _source_key(src) + [packed], lambda: _shader_bytes(src, packed))
+
+
+def _install_packed_texture(manifest: InstallManifest, red: str, green: str, dst: str) -> bool:
+    key = ["pack", _source_key(red), _source_key(green)]
+    return manifest.install(dst, key, lambda: pack_mura_textures(red, green))
+
+
+class IOExecutor:
+    """Bounded thread pool for blocking file work."""
+
+    def __init__(self, workers: int = IO_WORKERS, max_pending: int = IO_MAX_PENDING):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="muradeck-io")
+        self._slots = asyncio.Semaphore(max_pending)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.depth = 0
+        self.max_depth = 0
+        self.submitted = 0
+        self.failed = 0
+        self._waits: deque[float] = deque(maxlen=256)
+
+    async def run(self, fn, *args):
+        queued = time.perf_counter()
+        self.submitted += 1
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+        def job():
+            self._waits.append((time.perf_counter() - queued) * 1000.0)
+            return fn(*args)
+
+        try:
+            async with self._slots:
+                return await asyncio.get_running_loop().run_in_executor(self._pool, job)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.depth -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "failed": self.failed,
+            "wait": _summarize_ms(self._waits),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+METRIC_BUCKETS_MS = (0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0)
+METRIC_PREFIX = "muradeck_"
+METRICS_PROM_FILE = "metrics.prom"
+
+
+def _prom_labels(labels: tuple, extra: str = "") -> str:
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """Counters and millisecond histograms keyed by name and labels, thread-safe."""
+
+    def __init__(self, buckets=METRIC_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, tuple], float] = {}
+        # Per bucket counts (last one is +Inf), then sum and max
+        self._histograms: dict[tuple[str, tuple], list] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, ms: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        i = bisect.bisect_left(self.buckets, ms)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0.0]
+            h[i] += 1
+            h[-2] += ms
+            h[-1] = max(h[-1], ms)
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000.0, **labels)
+
+    def _quantile(self, h: list, count: int, q: float) -> float:
+        rank = q * count
+        seen = 0
+        for bound, n in zip(self.buckets, h):
+            seen += n
+            if seen >= rank:
+                return bound
+        return h[-1]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(h) for k, h in self._histograms.items()}
+
+        out = {"counters": {}, "histograms": {}}
+        for (name, labels), value in sorted(counters.items()):
+            out["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), h in sorted(histograms.items()):
+            count = sum(h[:-2])
+            out["histograms"].setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": count,
+                "sum_ms": round(h[-2], 3),
+                "max_ms": round(h[-1], 3),
+                "p50_ms": self._quantile(h, count, 0.5),
+                "p99_ms": self._quantile(h, count, 0.99),
+            })
+        return out
+
+    def prometheus(self) -> str:
+        """Text exposition format, counters as `<name>_total`."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(h) for k, h in self._histograms.items()}
+
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{METRIC_PREFIX}{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_prom_labels(labels)} {value}")
+        for (name, labels), h in sorted(histograms.items()):
+            metric = f"{METRIC_PREFIX}{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), h):
+                cumulative += n
+                le = _prom_labels(labels, f'le="{bound}"')
+                lines.append(f"{metric}_bucket{le} {cumulative}")
+            lines.append(f"{metric}_sum{_prom_labels(labels)} {h[-2]}")
+            lines.append(f"{metric}_count{_prom_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+APPLY_MAX_RATE = 10.0
+APPLY_SETTLE = 0.02
+
+# (trigger, perf_counter at the event) of the entry point currently running
+APPLY_TRIGGER: contextvars.ContextVar[tuple[str, float | None]] = contextvars.ContextVar(
+    "muradeck_apply_trigger", default=("toggle", None)
+)
+
+
+def _triggers(trigger: str):
+    """Label the applies an entry point causes with `trigger`, timed from the call."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def run(*args, **kwargs):
+            token = APPLY_TRIGGER.set((trigger, time.perf_counter()))
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                APPLY_TRIGGER.reset(token)
+        return run
+    return wrap
+
+
+class CoalescingScheduler:
+    """Latest-wins, rate-limited scheduler for bursty inputs."""
+
+    def __init__(self, apply, max_rate: float = APPLY_MAX_RATE, settle: float = 0.0):
+        self.apply = apply
+        self.max_rate = max_rate
+        self.settle = settle
+        self.received = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.applied = 0
+        self.last_wait = 0.0
+        self._pending = None
+        self._has_pending = False
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._inflight: asyncio.Task | None = None
+        self._last_start = 0.0
+        self._last_cancelled = False
+
+    def submit(self, value) -> bool:
+        """Queue `value`, True when it replaced one that was still pending."""
+        self.received += 1
+        coalesced = self._has_pending
+        if coalesced:
+            self.coalesced += 1
+        self._pending = value
+        self._has_pending = True
+        if self._inflight and not self._inflight.done() and not self._last_cancelled:
+            self._inflight.cancel()
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return coalesced
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            woke = time.perf_counter()
+            if self.settle > 0:
+                await asyncio.sleep(self.settle)
+            self._wake.clear()
+            if self.max_rate > 0:
+                delay = self._last_start + 1.0 / self.max_rate - time.monotonic()
+                if delay > 0:
+                    # Submits landing meanwhile just replace the pending value
+                    await asyncio.sleep(delay)
+            if not self._has_pending:
+                continue
+            value = self._pending
+            self._pending = None
+            self._has_pending = False
+            self._last_start = time.monotonic()
+            self.last_wait = time.perf_counter() - woke
+            self._inflight = asyncio.create_task(self.apply(value))
+            await asyncio.wait({self._inflight})
+            self._last_cancelled = self._inflight.cancelled()
+            if self._last_cancelled:
+                self.cancelled += 1
+            elif self._inflight.exception():
+                decky.logger.error(f"[MuraDeck] Scheduled apply failed: {self._inflight.exception()}")
+            else:
+                self.applied += 1
+            self._inflight = None
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "applied": self.applied,
+            "max_rate": self.max_rate,
+        }
+
+    async def stop(self):
+        self._has_pending = False
+        for task in (self._inflight, self._task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._inflight = None
+
+
+APPLY_TRACE_SIZE = 256
+
+
+class ApplyTrace:
+    """Fixed-size ring of apply decisions."""
+
+    def __init__(self, size: int = APPLY_TRACE_SIZE):
+        self._ring: list[tuple | None] = [None] * size
+        self._next = 0
+        self.recorded = 0
+
+    def record(self, trigger: str, old, new, outcome: str,
+               wait_ms: float | None = None, total_ms: float | None = None):
+        self._ring[self._next] = (time.time(), trigger, old, new, outcome, wait_ms, total_ms)
+        self._next = (self._next + 1) % len(self._ring)
+        self.recorded += 1
+
+    def records(self, limit: int | None = None) -> list[tuple]:
+        """Oldest first, at most the `limit` newest."""
+        ordered = [r for r in self._ring[self._next:] + self._ring[:self._next] if r is not None]
+        return ordered[-limit:] if limit else ordered
+
+    def to_jsonl(self, limit: int | None = None) -> str:
+        lines = []
+        for ts, trigger, old, new, outcome, wait_ms, total_ms in self.records(limit):
+            lines.append(json.dumps({
+                "ts": round(ts, 3),
+                "trigger": trigger,
+                "outcome": outcome,
+                "old": old._asdict() if old is not None else None,
+                "new": new._asdict() if new is not None else None,
+                "wait_ms": round(wait_ms, 3) if wait_ms is not None else None,
+                "total_ms": round(total_ms, 3) if total_ms is not None else None,
+            }, separators=(",", ":")))
+        return "".join(line + "\n" for line in lines)
+
+
+APP_SETTINGS_KEY = "apps"
+APP_SETTINGS_FLUSH_DELAY = 2.0
+
+# Flat per-app keys used before the apps table, mapped to (field, per display)
+RE_APP_SETTING_KEYS = [
+    (re.compile(r"^sharpness_app_(\d+)_(internal|external)$"), "sharpness"),
+    (re.compile(r"^cas_enabled_app_(\d+)_(internal|external)$"), "cas"),
+    (re.compile(r"^sharpness_perapp_enabled_(\d+)$"), "sharpness_perapp"),
+    (re.compile(r"^cas_perapp_enabled_(\d+)$"), "cas_perapp"),
+]
+
+
+class AppSettings:
+    """Per-app settings as one table under the "apps" setting, committed write-behind."""
+
+    def __init__(self, manager, flush_delay: float = APP_SETTINGS_FLUSH_DELAY):
+        self.manager = manager
+        self.flush_delay = flush_delay
+        self.flushes = 0
+        self.writes = 0
+        # {appid: {"sharpness_perapp", "cas_perapp", "internal": {"sharpness", "cas"}, "external": {...}}}
+        self._apps: dict[str, dict] = manager.getSetting(APP_SETTINGS_KEY, {})
+        self._dirty = False
+        self._flush_task: asyncio.Task | None = None
+
+    def migrate(self) -> int:
+        """Move the old flat per-app keys into the table, returns how many moved."""
+        moved = 0
+        for key in list(self.manager.settings):
+            for pattern, field in RE_APP_SETTING_KEYS:
+                m = pattern.match(key)
+                if not m:
+                    continue
+                value = self.manager.settings.pop(key)
+                entry = self._apps.setdefault(m.group(1), {})
+                if m.lastindex == 2:
+                    entry.setdefault(m.group(2), {})[field] = value
+                else:
+                    entry[field] = value
+                moved += 1
+                break
+        if moved:
+            self.flush()
+        return moved
+
+    def get(self, appid, field: str, display: str | None = None, default=None):
+        entry = self._apps.get(str(appid))
+        if entry is None:
+            return default
+        if display is not None:
+            entry = entry.get(display)
+            if entry is None:
+                return default
+        return entry.get(field, default)
+
+    def set(self, appid, field: str, value, display: str | None = None):
+        entry = self._apps.setdefault(str(appid), {})
+        if display is not None:
+            entry = entry.setdefault(display, {})
+        if field in entry and entry[field] == value:
+            return
+        entry[field] = value
+        self.writes += 1
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """Have the next flush commit, also used for other deferred settings."""
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_delay)
+        self._flush_task = None
+        self.flush()
+
+    def flush(self):
+        if self._flush_task and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+        self.manager.setSetting(APP_SETTINGS_KEY, self._apps)
+        self.manager.commit()
+        self._dirty = False
+        self.flushes += 1
+
+    def flush_pending(self):
+        if self._dirty:
+            self.flush()
+
+
+class EffectState(NamedTuple):
+    """Everything that decides which shader variant gamescope shows."""
+    effect: str | None
+    map_scale: float | None = None
+    fade_near: float | None = None
+    grain: bool = False
+    lgg: bool = False
+    cas: bool = False
+    sharpness: float = 0.0
+    generation: int = 0
+
 
 class Plugin:
     def __init__(self):
@@ -89,21 +954,35 @@ class Plugin:
         self.current_effect = FX_SDR
         self.current_appid: str | None = None
 
-        self.last_map_scale: float | None = None
-        self.last_fade_near: float | None = None
-
         self.current_brightness: int | None = None
 
         self._enabled = settings.getSetting("enabled", False)
-        self._watch_task = None
+
+        self._app_settings = AppSettings(settings)
+        self._resolved: dict[tuple[str | None, str], tuple[bool, float]] = {}
+        self._resolve_hits = 0
+        self._resolve_misses = 0
+        moved = self._app_settings.migrate()
+        if moved:
+            decky.logger.info(f"[MuraDeck] Migrated {moved} per-app settings into the apps table")
 
         self._monitor_watch_enabled = settings.getSetting(
             "watch_external_monitor", True
         )
         self._is_external_display = False
-        self._monitor_watch_task = None
         self._use_cas_only = False
 
+        self._log_offsets: dict[str, list[int]] = dict(settings.getSetting("log_offsets", {}))
+        self._log_offsets_saved_at = time.monotonic()
+        self._metrics = Metrics()
+        self._logs = LogMultiplexer(
+            [LOG_LINUX, LOG_GAMEPROC, LOG_DISPLAYMGR],
+            self._log_offsets,
+            backlog={LOG_GAMEPROC: 10},
+            on_progress=self._save_log_offsets,
+            on_handled=self._on_log_handled,
+        )
+
         self._grain_enabled_sdr = settings.getSetting("grain_enabled_sdr", True)
         self._lgg_enabled_sdr = settings.getSetting("lgg_enabled_sdr", True)
         self._grain_enabled_hdr = settings.getSetting("grain_enabled_hdr", True)
@@ -124,15 +1003,127 @@ class Plugin:
             self._current_sharpness: float = settings.getSetting("sharpness_global_internal", 0.0)
 
         self._brightness_enabled = settings.getSetting("brightness_enabled", True)
+        self._brightness_hysteresis: int = settings.getSetting("brightness_hysteresis", BRIGHTNESS_HYSTERESIS)
+        self._brightness_row: tuple[str | None, int | None] = (None, None)
+        self._hysteresis_holds = 0
+
+        # Entry points only update state, the reconciler is the one writer
+        self._reconciler = CoalescingScheduler(
+            self._reconcile,
+            settings.getSetting("apply_max_rate", APPLY_MAX_RATE),
+            settle=APPLY_SETTLE,
+        )
+        self._applied_state: EffectState | None = None
+        self._apply_trigger = "toggle"
+        self._trace = ApplyTrace()
+        self._generation = 0
+        self._renders = 0
+        self._writes = 0
+        self._skipped = 0
+
+        self._io = IOExecutor()
+        self._manifest = InstallManifest(os.path.join(decky.DECKY_PLUGIN_SETTINGS_DIR, INSTALL_MANIFEST_FILE))
+        self._manifest.load()
+        self._icons = SteamIconCache(STEAM_ICON_PATH)
+        self._variants = ShaderVariantCache(FX_DIR)
+        self._rendered_effect: dict[str, str] = {}
+        self._active_effect_file: str | None = None
+        self._active_effect_source: str | None = None
+        self._effect_slot: dict[str, int] = {}
+
+        self._x11 = {d: XPropertyClient(d) for d in (":0", ":1")}
+        self._xprop = {d: XpropHelper(d, self._metrics) for d in (":0", ":1")}
+        self._x_snapshot = PropertySnapshot(
+            functools.partial(self._read_root_cardinals, ":0"), metrics=self._metrics
+        )
+        self._x_props: dict[str, int | None] = {}
+        self._x_watch_task = None
+
+        self._state_version = 0
+        self._published_state: dict = {}
+        self._state_appid: int | str | None = None
+        self._state_dirty = False
+        self._state_task: asyncio.Task | None = None
+
+        self._event_started: float | None = None
+        self._apply_latency: deque[float] = deque(maxlen=128)
+
+        self._startup: dict[str, float | bool] = {"restored": False}
+        self._mark_startup("plugin_init")
 
     async def _main(self):
         decky.logger.info("[MuraDeck] Started")
+        self._mark_startup("main_started")
+        # Show the last known effect right away, the watchers correct it
+        await self._restore_effect()
+        await self._seed_from_logs()
+        self._x_watch_task = asyncio.create_task(self._x_property_watcher())
         if self._monitor_watch_enabled:
-            self._monitor_watch_task = asyncio.create_task(
-                self._ext_monitor_watcher()
-            )
+            self._start_monitor_watcher()
         if self._enabled:
-            self._watch_task = asyncio.create_task(self._log_watcher())
+            self._start_log_watcher()
+        self._mark_startup("watchers_started")
+
+    def _mark_startup(self, milestone: str):
+        if milestone not in self._startup:
+            self._startup[milestone] = round((time.perf_counter() - LOADED_AT) * 1000.0, 1)
+
+    @_triggers("startup")
+    async def _seed_from_logs(self):
+        """Take profile and display from the newest relevant log lines."""
+        try:
+            colorspace, screen = await asyncio.gather(
+                self._io.run(scan_log_backwards, LOG_LINUX, b"colorspace:", RE_COLORSPACE),
+                self._io.run(scan_log_backwards, LOG_DISPLAYMGR, b"OnScreenChanged", RE_SCREEN_CHANGED),
+            )
+        except Exception as e:
+            decky.logger.error(f"[MuraDeck] Log scan failed: {e}")
+            return
+        self._mark_startup("log_scan_done")
+
+        if screen is not None:
+            external = screen.group(1) == b"1"
+            decky.logger.info(f"[MuraDeck] Last screen change: external={external}")
+            if external != self._is_external_display:
+                self._is_external_display = external
+                self._current_cas, self._current_sharpness = await self._resolve_app(self.current_appid)
+            self._use_cas_only = external and self._monitor_watch_enabled
+        if not self._enabled and not self._use_cas_only:
+            return
+        if colorspace is not None:
+            cs = colorspace.group(1).decode()
+            decky.logger.info(f"[MuraDeck] Last colorspace: {cs}")
+            await self._set_profile(COLORSPACE_PROFILES.get(cs, "SDR"))
+        elif screen is not None:
+            self._request_apply()
+
+    async def get_startup_report(self) -> dict:
+        """Milliseconds from plugin load to each startup milestone."""
+        return dict(self._startup)
+
+    def _save_effect_snapshot(self):
+        snapshot = {
+            "profile": self.profile,
+            "brightness": self.current_brightness,
+            "cas": self._current_cas,
+            "sharpness": self._current_sharpness,
+        }
+        if snapshot != settings.getSetting("last_effect", None):
+            settings.setSetting("last_effect", snapshot)
+            self._app_settings.mark_dirty()
+
+    @_triggers("startup")
+    async def _restore_effect(self):
+        snapshot = settings.getSetting("last_effect", None)
+        # Display mode stays internal until the log scan finds an external screen
+        if not snapshot or not self._enabled:
+            return
+        self.current_brightness = snapshot.get("brightness")
+        self._current_cas = snapshot.get("cas", self._current_cas)
+        self._current_sharpness = snapshot.get("sharpness", self._current_sharpness)
+        self._startup["restored"] = True
+        decky.logger.info(f"[MuraDeck] Restoring last effect: {snapshot}")
+        await self._set_profile(snapshot.get("profile", "SDR"))
 
     async def toggle_enabled(self, enable: bool):
         decky.logger.info(
@@ -143,20 +1134,13 @@ class Plugin:
         self._enabled = enable
 
         if enable:
-            self.last_map_scale = None
-            self.last_fade_near = None
-
-            if self._watch_task is None or self._watch_task.done():
-                self._watch_task = asyncio.create_task(self._log_watcher())
+            self._start_log_watcher()
             await self._apply_current_profile()
         else:
-            if self._watch_task and not self._watch_task.done():
-                self._watch_task.cancel()
-                try:
-                    await self._watch_task
-                except asyncio.CancelledError:
-                    decky.logger.info("[MuraDeck] Log watcher cancelled")
-            await self._clear_effect()
+            if self._logs.is_registered("colorspace"):
+                self._logs.unregister("colorspace")
+                decky.logger.info("[MuraDeck] Log watcher cancelled")
+            self._request_apply()
 
     async def get_enabled(self) -> bool:
         return self._enabled
@@ -169,6 +1153,7 @@ class Plugin:
         else:
             return "HDR scRGB"
 
+    @_triggers("resume")
     async def resume_from_suspend(self):
         if not self._enabled:
             decky.logger.info(
@@ -178,56 +1163,69 @@ class Plugin:
         decky.logger.info(
             "[MuraDeck] [Resume] Re-applying last known effect after suspend..."
         )
-        await self._patch_fx(self.current_effect)
-        await self._set_effect(self.current_effect)
+        self._request_apply(reload=True)
 
+    @_triggers("brightness")
     async def brightness_state(self, brightness: int):
         self.current_brightness = brightness
         if not self._enabled:
             return
+        self._request_apply()
+
+    def _mura_levels(self) -> tuple[float | None, float | None]:
+        """Map scale and fade-near for the current profile and brightness."""
         if not self._brightness_enabled:
-            decky.logger.info("[MuraDeck] [Brightness=OFF]")
-            await self._apply_static()
+            if self.profile == "HDR10PQ":
+                return STATIC_HDR10PQ
+            if self.profile == "HDRscRGB":
+                return STATIC_HDRscRGB, None
+            return STATIC_SDR, None
+        brightness = self.current_brightness
+        if brightness is None:
+            return None, None
+        lut = BRIGHTNESS_LUTS.get(self.profile, BRIGHTNESS_LUTS["SDR"])
+        held_profile, held = self._brightness_row
+        if held_profile != self.profile:
+            held = None
+        row = lut.lookup(brightness, held, self._brightness_hysteresis)
+        if row != lut.row_for(brightness):
+            self._hysteresis_holds += 1
+        if row is None:
+            # 0 % matches no row: as before the LUT, keep the levels already shown
+            applied = self._applied_state
+            if applied is not None and applied.effect == self.current_effect:
+                return applied.map_scale, applied.fade_near
+            return None, None
+        self._brightness_row = (self.profile, row)
+        return lut.levels[row]
+
+    async def set_brightness_hysteresis(self, band: int):
+        if band < 0:
+            decky.logger.warning(f"[MuraDeck] Ignoring negative brightness hysteresis: {band}")
             return
-
-        decky.logger.info(f"[MuraDeck] [Brightness] {brightness}% (Profile={self.profile})")
-        if self.profile == "HDR10PQ":
-            for thr, map_s, fade_n in BRIGHTNESS_TABLE_HDR10PQ:
-                if brightness > thr:
-                    if (
-                        self.last_map_scale != map_s
-                        or self.last_fade_near != fade_n
-                    ):
-                        decky.logger.info(
-                            f"[MuraDeck] Updating HDR10PQ → Scale={map_s}, Fade={fade_n}"
-                        )
-                        await self._patch_fx(
-                            FX_HDR10PQ, map_scale=map_s, fade_near=fade_n
-                        )
-                        await self._set_effect(FX_HDR10PQ)
-                        self.last_map_scale = map_s
-                        self.last_fade_near = fade_n
-                    break
-        elif self.profile == "HDRscRGB":
-            for thr, map_s in BRIGHTNESS_TABLE_HDRscRGB:
-                if brightness > thr:
-                    if self.last_map_scale != map_s:
-                        decky.logger.info(
-                            f"[MuraDeck] Updating HDRscRGB → Scale={map_s}"
-                        )
-                        await self._patch_fx(FX_HDRscRGB, map_scale=map_s)
-                        await self._set_effect(FX_HDRscRGB)
-                        self.last_map_scale = map_s
-                    break
-        else:
-            for thr, map_s in BRIGHTNESS_TABLE_SDR:
-                if brightness > thr:
-                    if self.last_map_scale != map_s:
-                        decky.logger.info(f"[MuraDeck] Updating SDR → Scale={map_s}")
-                        await self._patch_fx(FX_SDR, map_scale=map_s)
-                        await self._set_effect(FX_SDR)
-                        self.last_map_scale = map_s
-                    break
+        settings.setSetting("brightness_hysteresis", band)
+        self._app_settings.mark_dirty()
+        self._brightness_hysteresis = band
+        decky.logger.info(f"[MuraDeck] Brightness hysteresis → ±{band}%")
+
+    async def set_apply_max_rate(self, rate: float):
+        if rate <= 0:
+            decky.logger.warning(f"[MuraDeck] Ignoring apply max rate {rate}, must be above 0")
+            return
+        settings.setSetting("apply_max_rate", rate)
+        self._app_settings.mark_dirty()
+        self._reconciler.max_rate = rate
+        decky.logger.info(f"[MuraDeck] Apply max rate → {rate}/s")
+
+    async def get_reconcile_stats(self) -> dict:
+        stats = self._reconciler.stats()
+        stats.update(
+            renders=self._renders,
+            writes=self._writes,
+            skipped=self._skipped,
+            hysteresis_holds=self._hysteresis_holds,
+        )
+        return stats
 
     async def toggle_brightness(self, enable: bool):
         settings.setSetting("brightness_enabled", enable)
@@ -236,26 +1234,29 @@ class Plugin:
         decky.logger.info(
             f"[MuraDeck] Brightness State {'enabled' if enable else 'disabled'}"
         )
-        self.last_map_scale = None
-        self.last_fade_near = None
-        if self._enabled and self.current_brightness is not None:
-            await self.brightness_state(self.current_brightness)
+        self._request_apply()
 
     async def get_brightness_enabled(self) -> bool:
         return self._brightness_enabled
     
-    async def get_steam_icon(self, appid: int, icon_hash: str) -> str | None:
+    async def get_steam_icon(self, appid: int, icon_hash: str, size: int | None = None) -> str | None:
         try:
-            path = os.path.join(STEAM_ICON_PATH, str(appid), f"{icon_hash}.jpg")
-            if not os.path.exists(path):
-                return None
-            with open(path, "rb") as f:
-                encoded = base64.b64encode(f.read()).decode("utf-8")
-                return encoded
+            return await self._io.run(self._icons.get, appid, icon_hash, size)
         except Exception as e:
             print(f"[get_steam_icon] Error: {e}")
             return None
-        
+
+    async def get_steam_icons(self, items: list, size: int | None = None) -> list[str | None]:
+        """Icons for a list of [appid, icon_hash] pairs, in the same order."""
+        try:
+            return await self._io.run(self._icons.get_many, items, size)
+        except Exception as e:
+            decky.logger.error(f"[MuraDeck] get_steam_icons error: {e}")
+            return [None] * len(items)
+
+    async def get_icon_cache_stats(self) -> dict:
+        return self._icons.stats()
+
     async def on_focus_change(self):
         appid = await self.get_focused_appid()
         if appid is None or appid == self._last_focused_appid:
@@ -277,15 +1278,11 @@ class Plugin:
         if saved_profile:
             decky.logger.info(f"[MuraDeck] Restoring profile '{saved_profile}' for AppID={appid}")
             await self._set_profile(saved_profile)
-            cas = await self.get_cas(appid)
-            sharp = await self.get_sharpness(appid)
-            self._current_cas = cas
-            self._current_sharpness = sharp
-            await self._patch_fx(self.current_effect)
-            await self._set_effect(self.current_effect)
+            self._current_cas, self._current_sharpness = await self._resolve_app(appid)
         else:
             decky.logger.info(f"[MuraDeck] No saved profile for AppID={appid}, using current")
         
+    @_triggers("game_state")
     async def on_game_state_update(self, appid: int, running: bool):
         if not self._enabled and not self._use_cas_only:
             decky.logger.info("[MuraDeck] Plugin is disabled and not in CAS-only mode. Skipping game state update.")
@@ -300,24 +1297,24 @@ class Plugin:
             self.current_appid = str(appid)
             decky.logger.info(f"[MuraDeck] Game started: {appid}")
 
-            wants_hdr = await self.check_gamescope_hdr()
+            # Focus and HDR feedback come back from one read
+            props = await self._gamescope_props()
+            if await self.get_focused_appid(props) == appid:
+                # Already focused, the focus event that follows has nothing to switch
+                self._last_focused_appid = appid
+            wants_hdr = await self.check_gamescope_hdr(props)
             if not wants_hdr:
                 decky.logger.info(f"[MuraDeck] Gamescope isn't HDR → SDR profile")
                 await self._set_profile("SDR")
 
-            sharp = await self.get_sharpness(appid)
-            cas = await self.get_cas(appid)
-            self._current_sharpness = sharp
-            self._current_cas = cas
+            cas, sharp = await self._resolve_app(appid)
+            self._current_cas, self._current_sharpness = cas, sharp
 
             if self._use_cas_only:
                 decky.logger.info(f"[MuraDeck] [CAS-only] Applying sharp={sharp}, cas={cas}")
-                await self._patch_fx(FX_CAS)
-                await self._set_effect(FX_CAS)
+                self._request_apply()
             else:
                 await self._apply_current_profile()
-                await self._patch_fx(self.current_effect)
-                await self._set_effect(self.current_effect)
 
         else:
             if appid in self._app_profile_cache:
@@ -329,162 +1326,211 @@ class Plugin:
             self._current_cas = False
 
             await self._set_profile("SDR")
-            await self._patch_fx(self.current_effect)
-            await self._set_effect(self.current_effect)
 
-    async def _log_watcher(self):
+    def _start_log_watcher(self):
+        if self._logs.is_registered("colorspace"):
+            return
         for p in (LOG_LINUX, LOG_GAMEPROC):
             if not os.path.exists(p):
                 decky.logger.warning(f"[MuraDeck] Log not found: {p}")
-
-        proc = await asyncio.create_subprocess_exec(
-            "tail", "-F", LOG_LINUX, LOG_GAMEPROC,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
+        self._logs.register(
+            "colorspace", (LOG_LINUX, LOG_GAMEPROC),
+            b"colorspace:", RE_COLORSPACE, self._on_colorspace,
         )
-        assert proc.stdout
 
-        re_colorspace = re.compile(
-            r"colorspace:.*(HDR10_ST2084|SRGB_NONLINEAR|SRGB_LINEAR)"
-        )
+    @_triggers("colorspace")
+    async def _on_colorspace(self, m: re.Match):
+        await self._set_profile(COLORSPACE_PROFILES.get(m.group(1).decode(), "SDR"))
 
-        while True:
-            line = await proc.stdout.readline()
-            if not line:
-                break
-            text = line.decode("utf-8", "ignore").rstrip()
-
-            m = re_colorspace.search(text)
-            if m:
-                cs = m.group(1)
-                if cs == "HDR10_ST2084":
-                    await self._set_profile("HDR10PQ")
-                elif cs == "SRGB_LINEAR":
-                    await self._set_profile("HDRscRGB")
-                else:
-                    await self._set_profile("SDR")
+    def _on_log_handled(self, trigger: str, started: float):
+        elapsed = (time.perf_counter() - started) * 1000.0
+        self._metrics.observe("event_handled_ms", elapsed, trigger=trigger, profile=self.profile)
 
-    async def get_focused_appid(self):
-        try:
-            cmd = 'export DISPLAY=:0 && xprop -root GAMESCOPE_FOCUSED_APP'
-            env = os.environ.copy()
-            env["LD_LIBRARY_PATH"] = ""
-            proc = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env
-            )
-            stdout, stderr = await proc.communicate()
-            if proc.returncode == 0:
-                output = stdout.decode().strip()
-                match = re.search(r"GAMESCOPE_FOCUSED_APP\(CARDINAL\) = (\d+)", output)
-                if match:
-                    appid = int(match.group(1))
-                    decky.logger.info(f"[MuraDeck] Focused AppID: {appid}")
-                    return appid
-                else:
-                    decky.logger.warning("[MuraDeck] GAMESCOPE_FOCUSED_APP not found in xprop output")
+    def _save_log_offsets(self, force: bool = False):
+        """Persist follower offsets, at most every LOG_OFFSET_SAVE_INTERVAL."""
+        now = time.monotonic()
+        if not force and now < self._log_offsets_saved_at + LOG_OFFSET_SAVE_INTERVAL:
+            return
+        self._log_offsets_saved_at = now
+        if self._log_offsets != settings.getSetting("log_offsets", {}):
+            settings.setSetting("log_offsets", dict(self._log_offsets))
+            if force:
+                settings.commit()
             else:
-                decky.logger.error(f"[MuraDeck] Failed to run xprop: {stderr.decode().strip()}")
+                # Ride along with the next write-behind flush
+                self._app_settings.mark_dirty()
+
+    async def _read_root_cardinals(self, display: str, names: list[str]) -> dict[str, int | None]:
+        """Read root window CARDINALs in one batch, natively or through the xprop helper."""
+        try:
+            with self._metrics.span("x_call_ms", op="get", transport="x11"):
+                return await self._x11[display].get_cardinals(names)
+        except Exception as e:
+            decky.logger.debug(f"[MuraDeck] X11 read {names} on {display} failed: {e}")
+
+        try:
+            with self._metrics.span("x_call_ms", op="get", transport="xprop"):
+                return await self._xprop[display].get_cardinals(names)
+        except Exception as e:
+            decky.logger.error(f"[MuraDeck] xprop read {names} failed: {e}")
+            return dict.fromkeys(names)
+
+    async def _write_root_utf8(self, display: str, name: str, value: str) -> bool:
+        """Write a root window UTF8_STRING natively, falling back to xprop."""
+        try:
+            with self._metrics.span("x_call_ms", op="set", transport="x11"):
+                await self._x11[display].set_utf8(name, value)
+            return True
+        except Exception as e:
+            decky.logger.debug(f"[MuraDeck] X11 write {name} on {display} failed: {e}")
+
+        try:
+            with self._metrics.span("x_call_ms", op="set", transport="xprop"):
+                await self._xprop[display].set_utf8(name, value)
+            return True
+        except Exception as e:
+            decky.logger.error(f"[MuraDeck] xprop set {name} failed: {e}")
+            return False
+
+    async def _gamescope_props(self) -> dict[str, int | None]:
+        """Focused app and HDR feedback on :0, from the watcher or one shared read."""
+        names = [X_PROP_FOCUSED_APP, X_PROP_HDR_FEEDBACK]
+        if all(name in self._x_props for name in names):
+            return {name: self._x_props[name] for name in names}
+        return await self._x_snapshot.get(names)
+
+    async def get_focused_appid(self, props: dict | None = None):
+        try:
+            if props is None:
+                props = await self._gamescope_props()
+            appid = props.get(X_PROP_FOCUSED_APP)
+            if appid is not None:
+                decky.logger.info(f"[MuraDeck] Focused AppID: {appid}")
+                return appid
+            decky.logger.warning("[MuraDeck] GAMESCOPE_FOCUSED_APP not found")
         except Exception as e:
             decky.logger.error(f"[MuraDeck] get_focused_appid error: {e}")
         return None
     
-    async def check_gamescope_hdr(self) -> bool:
+    async def check_gamescope_hdr(self, props: dict | None = None) -> bool:
         try:
-            cmd = 'export DISPLAY=:0 && xprop -root GAMESCOPE_COLOR_APP_WANTS_HDR_FEEDBACK'
-            env = os.environ.copy()
-            env["LD_LIBRARY_PATH"] = ""
-            proc = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env
-            )
-            stdout, stderr = await proc.communicate()
-            if proc.returncode == 0:
-                output = stdout.decode().strip()
-                match = re.search(r"GAMESCOPE_COLOR_APP_WANTS_HDR_FEEDBACK\(CARDINAL\) = (\d+)", output)
-                if match:
-                    value = int(match.group(1))
-                    decky.logger.info(f"[MuraDeck] HDR Feedback Requested: {value}")
-                    return value == 1
-                else:
-                    decky.logger.warning("[MuraDeck] HDR Feedback info not found in xprop output")
-            else:
-                decky.logger.error(f"[MuraDeck] xprop HDR check failed: {stderr.decode().strip()}")
+            if props is None:
+                props = await self._gamescope_props()
+            value = props.get(X_PROP_HDR_FEEDBACK)
+            if value is not None:
+                decky.logger.info(f"[MuraDeck] HDR Feedback Requested: {value}")
+                return value == 1
+            decky.logger.warning("[MuraDeck] HDR Feedback info not found")
         except Exception as e:
             decky.logger.error(f"[MuraDeck] HDR feedback check error: {e}")
         return False
 
-    async def _ext_monitor_watcher(self):
+    async def _x_property_watcher(self):
+        """Follow focus and HDR feedback through PropertyNotify on the :0 root."""
+        client = self._x11[":0"]
+        names = [X_PROP_FOCUSED_APP, X_PROP_HDR_FEEDBACK]
+        while True:
+            try:
+                events = await client.subscribe(names)
+                for name in names:
+                    self._x_props[name] = await client.get_cardinal(name)
+                decky.logger.info("[MuraDeck] Watching gamescope root properties")
+                self._mark_startup("x_watch_ready")
+
+                while (name := await events.get()) is not None:
+                    started = time.perf_counter()
+                    # Let a burst settle so focus is handled before HDR feedback
+                    await asyncio.sleep(X_WATCH_SETTLE)
+                    changed = {name}
+                    while not events.empty():
+                        changed.add(events.get_nowait())
+                    if None in changed:
+                        break
+                    for prop in names:
+                        if prop not in changed:
+                            continue
+                        value = await client.get_cardinal(prop)
+                        if value != self._x_props.get(prop):
+                            self._x_props[prop] = value
+                            await self._on_x_property(prop, value)
+                    elapsed = (time.perf_counter() - started) * 1000.0
+                    self._metrics.observe("event_handled_ms", elapsed, trigger="focus", profile=self.profile)
+            except asyncio.CancelledError:
+                self._x_props.clear()
+                raise
+            except Exception as e:
+                decky.logger.debug(f"[MuraDeck] Property watcher: {e}")
+            # Back to reads, none of what was snapshotted before is current
+            self._x_props.clear()
+            self._x_snapshot.invalidate()
+            await asyncio.sleep(1.0)
+
+    @_triggers("focus")
+    async def _on_x_property(self, name: str, value: int | None):
+        if not self._enabled and not self._use_cas_only:
+            return
+        if name == X_PROP_FOCUSED_APP:
+            decky.logger.info(f"[MuraDeck] [X11] Focused app → {value}")
+            await self.on_focus_change()
+        elif name == X_PROP_HDR_FEEDBACK:
+            decky.logger.info(f"[MuraDeck] [X11] HDR feedback → {value}")
+            if value != 1 and self.profile != "SDR" and not self._use_cas_only:
+                await self._set_profile("SDR")
+
+    def _start_monitor_watcher(self):
+        if self._logs.is_registered("monitor"):
+            return
         if not os.path.exists(LOG_DISPLAYMGR):
             decky.logger.warning(
-                "[MuraDeck] Log not found, failed to watch external monitor"
+                "[MuraDeck] Log not found, external monitor watcher waits for it"
             )
-            return
         decky.logger.info("[MuraDeck] Starting external monitor watcher...")
-        proc = await asyncio.create_subprocess_exec(
-            "tail", "-Fn0", LOG_DISPLAYMGR, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        self._logs.register(
+            "monitor", (LOG_DISPLAYMGR,),
+            b"OnScreenChanged", RE_SCREEN_CHANGED, self._on_screen_changed,
         )
-        assert proc.stdout is not None
-        pattern = re.compile(r"OnScreenChanged:\s+gamescope event external: (\d)")
-
-        while True:
-            line = await proc.stdout.readline()
-            if not line:
-                break
-            decoded = line.decode("utf-8").strip()
-            match = pattern.search(decoded)
-            if match:
-                state = match.group(1)
-                decky.logger.info(f"[Monitor Watcher] External = {state}")
-
-                # Call focused appid
-                await self.on_focus_change()
-                if state == "1":
-                    self._is_external_display = True
-                    await emit("monitor_changed", True)
-                    appid = await self.get_focused_appid()
-                    if appid:
-                        self._current_cas = await self.get_cas(appid)
-                        self._current_sharpness = await self.get_sharpness(appid)
-                        decky.logger.info(f"[Monitor] [External] Refreshed CAS={self._current_cas}, Sharp={self._current_sharpness}")
-
-                    if self._monitor_watch_enabled:
-                        decky.logger.info("[Monitor] External + Watch ON → CAS-only mode")
-                        self._use_cas_only = True
-                        if self._watch_task is None or self._watch_task.done():
-                            self._watch_task = asyncio.create_task(self._log_watcher())
-                        await self._patch_fx(FX_CAS)
-                        await self._set_effect(FX_CAS)
-                    else:
-                        decky.logger.info("[Monitor] External + Watch OFF → normal MuraDeck")
-                        self._use_cas_only = False
-                        await self.toggle_enabled(True)
-                elif state == "0":
-                    self._is_external_display = False
-                    await emit("monitor_changed", True)
-                    self._use_cas_only = False
-
-                    # Re-evaluate CAS and sharpness after monitor switch
-                    appid = await self.get_focused_appid()
-                    if appid:
-                        self._current_cas = await self.get_cas(appid)
-                        self._current_sharpness = await self.get_sharpness(appid)
-                        decky.logger.info(f"[Monitor] [Internal] Refreshed CAS={self._current_cas}, Sharp={self._current_sharpness}")
-
-                    if self._monitor_watch_enabled:
-                        decky.logger.info("[Monitor] External disconnected → restoring MuraDeck")
-                        if self._watch_task is None or self._watch_task.done():
-                            self._watch_task = asyncio.create_task(self._log_watcher())
-                        await self._apply_current_profile()
-                        await self._patch_fx(self.current_effect)
-                        await self._set_effect(self.current_effect)
-                    else:
-                        await self.toggle_enabled(True)
 
+    @_triggers("monitor")
+    async def _on_screen_changed(self, match: re.Match):
+        state = match.group(1).decode()
+        decky.logger.info(f"[Monitor Watcher] External = {state}")
+
+        # Call focused appid
+        await self.on_focus_change()
+        if state == "1":
+            self._is_external_display = True
+            await emit("monitor_changed", True)
+            appid = await self.get_focused_appid()
+            if appid:
+                self._current_cas, self._current_sharpness = await self._resolve_app(appid)
+                decky.logger.info(f"[Monitor] [External] Refreshed CAS={self._current_cas}, Sharp={self._current_sharpness}")
+
+            if self._monitor_watch_enabled:
+                decky.logger.info("[Monitor] External + Watch ON → CAS-only mode")
+                self._use_cas_only = True
+                self._start_log_watcher()
+                self._request_apply()
+            else:
+                decky.logger.info("[Monitor] External + Watch OFF → normal MuraDeck")
+                self._use_cas_only = False
+                await self.toggle_enabled(True)
+        elif state == "0":
+            self._is_external_display = False
+            await emit("monitor_changed", True)
+            self._use_cas_only = False
+
+            # Re-evaluate CAS and sharpness after monitor switch
+            appid = await self.get_focused_appid()
+            if appid:
+                self._current_cas, self._current_sharpness = await self._resolve_app(appid)
+                decky.logger.info(f"[Monitor] [Internal] Refreshed CAS={self._current_cas}, Sharp={self._current_sharpness}")
+
+            if self._monitor_watch_enabled:
+                decky.logger.info("[Monitor] External disconnected → restoring MuraDeck")
+                self._start_log_watcher()
+                await self._apply_current_profile()
+            else:
+                await self.toggle_enabled(True)
 
     async def is_external_display(self) -> bool:
         return self._is_external_display
@@ -494,15 +1540,11 @@ class Plugin:
         settings.commit()
         self._monitor_watch_enabled = enable
         if enable:
-            if self._monitor_watch_task is None or self._monitor_watch_task.done():
-                self._monitor_watch_task = asyncio.create_task(self._ext_monitor_watcher())
-        else:
-            if self._monitor_watch_task and not self._monitor_watch_task.done():
-                self._monitor_watch_task.cancel()
-                try:
-                    await self._monitor_watch_task
-                except asyncio.CancelledError:
-                    decky.logger.info("[MuraDeck] External monitor watcher cancelled")
+            self._start_monitor_watcher()
+        elif self._logs.is_registered("monitor"):
+            self._logs.unregister("monitor")
+            decky.logger.info("[MuraDeck] External monitor watcher cancelled")
+        self._notify_state()
 
     async def get_ext_monitor_watcher(self) -> bool:
         return self._monitor_watch_enabled
@@ -523,36 +1565,11 @@ class Plugin:
             self._lgg_enabled = self._lgg_enabled_sdr
 
         decky.logger.info(f"[MuraDeck] Profile → {profile}, effect={self.current_effect}")
-
-        if not self._brightness_enabled:
-            await self._apply_static()
-        elif self.current_brightness is not None:
-            await self.brightness_state(self.current_brightness)
-        else:
-            await self._apply_effect(self.current_effect)
+        self._request_apply()
 
     async def _apply_current_profile(self):
         await self._set_profile(self.profile)
 
-    async def _apply_static(self):
-        if self.profile == "HDR10PQ":
-            map_s, fade_n = STATIC_HDR10PQ
-            decky.logger.info(f"[MuraDeck] Applying HDR10PQ static ({map_s},{fade_n})")
-            await self._patch_fx(FX_HDR10PQ, map_s, fade_n)
-            await self._set_effect(FX_HDR10PQ)
-        elif self.profile == "HDRscRGB":
-            decky.logger.info(f"[MuraDeck] Applying HDRscRGB static ({STATIC_HDRscRGB})")
-            await self._patch_fx(FX_HDRscRGB, map_scale=STATIC_HDRscRGB)
-            await self._set_effect(FX_HDRscRGB)
-        else:
-            decky.logger.info(f"[MuraDeck] Applying SDR static ({STATIC_SDR})")
-            await self._patch_fx(FX_SDR, map_scale=STATIC_SDR)
-            await self._set_effect(FX_SDR)
-
-    async def _apply_effect(self, effect_file: str, map_scale=None, fade_near=None, hdr=None):
-        await self._patch_fx(effect_file, map_scale=map_scale, fade_near=fade_near)
-        await self._set_effect(effect_file)
-
     async def toggle_grain(self, enable: bool):
         if self.profile == "SDR":
             settings.setSetting("grain_enabled_sdr", enable)
@@ -563,8 +1580,7 @@ class Plugin:
         settings.commit()
         self._grain_enabled = enable
         decky.logger.info(f"[MuraDeck] Grain={'ON' if enable else 'OFF'} in {self.profile}")
-        await self._patch_fx(self.current_effect)
-        await self._set_effect(self.current_effect)
+        self._request_apply()
 
     async def get_grain(self) -> bool:
         return self._grain_enabled
@@ -579,8 +1595,7 @@ class Plugin:
         settings.commit()
         self._lgg_enabled = enable
         decky.logger.info(f"[MuraDeck] LGG={'ON' if enable else 'OFF'} in {self.profile}")
-        await self._patch_fx(self.current_effect)
-        await self._set_effect(self.current_effect)
+        self._request_apply()
 
     async def get_lgg(self) -> bool:
         return self._lgg_enabled
@@ -593,7 +1608,8 @@ class Plugin:
             "sharpness_global_internal"
         )
         settings.setSetting(key, value)
-        settings.commit()
+        self._app_settings.mark_dirty()
+        self._invalidate_resolved()
 
     async def get_global_sharpness(self) -> float:
         key = (
@@ -603,31 +1619,24 @@ class Plugin:
         )
         return settings.getSetting(key, 0.0)
 
+    def _display_key(self) -> str:
+        return "external" if self._is_external_display else "internal"
+
     # Per-App Sharpness
     async def set_app_sharpness(self, appid: int, value: float):
-        key = (
-            f"sharpness_app_{appid}_external"
-            if self._is_external_display else
-            f"sharpness_app_{appid}_internal"
-        )
-        settings.setSetting(key, value)
-        settings.commit()
+        self._app_settings.set(appid, "sharpness", value, self._display_key())
+        self._invalidate_resolved(appid)
 
     async def get_app_sharpness(self, appid: int) -> float | None:
-        key = (
-            f"sharpness_app_{appid}_external"
-            if self._is_external_display else
-            f"sharpness_app_{appid}_internal"
-        )
-        return settings.getSetting(key, None)
+        return self._app_settings.get(appid, "sharpness", self._display_key())
     
     # Per-App Enabled
     async def set_per_app_enabled(self, appid: int, enabled: bool):
-        settings.setSetting(f"sharpness_perapp_enabled_{appid}", enabled)
-        settings.commit()
+        self._app_settings.set(appid, "sharpness_perapp", enabled)
+        self._invalidate_resolved(appid)
 
     async def get_per_app_enabled(self, appid: int) -> bool:
-        return settings.getSetting(f"sharpness_perapp_enabled_{appid}", False)
+        return self._app_settings.get(appid, "sharpness_perapp", default=False)
     
     # Global CAS toggle
     async def set_global_cas(self, value: bool):
@@ -637,7 +1646,8 @@ class Plugin:
             "cas_enabled_global_internal"
         )
         settings.setSetting(key, value)
-        settings.commit()
+        self._app_settings.mark_dirty()
+        self._invalidate_resolved()
 
     async def get_global_cas(self) -> bool:
         key = (
@@ -649,28 +1659,18 @@ class Plugin:
     
     # Per-App CAS toggle
     async def set_app_cas(self, appid: int, value: bool):
-        key = (
-            f"cas_enabled_app_{appid}_external"
-            if self._is_external_display else
-            f"cas_enabled_app_{appid}_internal"
-        )
-        settings.setSetting(key, value)
-        settings.commit()
+        self._app_settings.set(appid, "cas", value, self._display_key())
+        self._invalidate_resolved(appid)
 
     async def get_app_cas(self, appid: int) -> bool | None:
-        key = (
-            f"cas_enabled_app_{appid}_external"
-            if self._is_external_display else
-            f"cas_enabled_app_{appid}_internal"
-        )
-        return settings.getSetting(key, None)
+        return self._app_settings.get(appid, "cas", self._display_key())
 
     async def set_cas_perapp_enabled(self, appid: int, enabled: bool):
-        settings.setSetting(f"cas_perapp_enabled_{appid}", enabled)
-        settings.commit()
+        self._app_settings.set(appid, "cas_perapp", enabled)
+        self._invalidate_resolved(appid)
 
     async def get_cas_perapp_enabled(self, appid: int) -> bool:
-        return settings.getSetting(f"cas_perapp_enabled_{appid}", False)
+        return self._app_settings.get(appid, "cas_perapp", default=False)
     
     # CAS Activation
     async def set_cas(self, value: bool, appid: int | None, per_app: bool):
@@ -681,15 +1681,10 @@ class Plugin:
 
         self._current_cas = value
 
-        await self._patch_fx(self.current_effect)
-        await self._set_effect(self.current_effect)
+        self._request_apply()
 
     async def get_cas(self, appid: int | None = None) -> bool:
-        if appid is not None and await self.get_cas_perapp_enabled(appid):
-            val = await self.get_app_cas(appid)
-            if val is not None:
-                return val
-        return await self.get_global_cas()
+        return (await self._resolve_app(appid))[0]
 
     async def toggle_cas_perapp(self, appid: int, enable: bool):
         await self.set_cas_perapp_enabled(appid, enable)
@@ -697,8 +1692,7 @@ class Plugin:
 
         self._current_cas = val
 
-        await self._patch_fx(self.current_effect)
-        await self._set_effect(self.current_effect)
+        self._request_apply()
     
     # Sharpness
     async def set_sharpness(self, value: float, appid: int | None, per_app: bool):
@@ -708,15 +1702,10 @@ class Plugin:
             await self.set_global_sharpness(value)
 
         self._current_sharpness = value
-        await self._patch_fx(self.current_effect)
-        await self._set_effect(self.current_effect)
+        self._request_apply()
 
     async def get_sharpness(self, appid: int | None = None) -> float:
-        if appid is not None and await self.get_per_app_enabled(appid):
-            v = await self.get_app_sharpness(appid)
-            if v is not None:
-                return v
-        return await self.get_global_sharpness()
+        return (await self._resolve_app(appid))[1]
     
     async def toggle_sharpness_perapp(self, appid: int, enable: bool):
         await self.set_per_app_enabled(appid, enable)
@@ -724,256 +1713,307 @@ class Plugin:
         value = await self.get_sharpness(appid)
 
         self._current_sharpness = value
-        await self._patch_fx(self.current_effect)
-        await self._set_effect(self.current_effect)
+        self._request_apply()
 
     async def get_sharpness_perapp_enabled(self, appid: int) -> bool:
         return await self.get_per_app_enabled(appid)
 
-    async def _patch_fx(
-            self, fx_name: str, map_scale: float | None = None,
-            fade_near: float | None = None):
+    async def _resolve_app(self, appid: int | str | None) -> tuple[bool, float]:
+        """Effective (cas, sharpness) of `appid` on the current display, memoized."""
+        key = (None if appid is None else str(appid), self._display_key())
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            self._resolve_hits += 1
+            return resolved
+        self._resolve_misses += 1
+
+        cas = sharpness = None
+        if appid is not None:
+            if await self.get_cas_perapp_enabled(appid):
+                cas = await self.get_app_cas(appid)
+            if await self.get_per_app_enabled(appid):
+                sharpness = await self.get_app_sharpness(appid)
+        if cas is None:
+            cas = await self.get_global_cas()
+        if sharpness is None:
+            sharpness = await self.get_global_sharpness()
+
+        self._resolved[key] = (cas, sharpness)
+        return cas, sharpness
+
+    def _invalidate_resolved(self, appid: int | str | None = None):
+        """Forget one app on every display, or every app on the current display."""
+        if appid is None:
+            display = self._display_key()
+            stale = [k for k in self._resolved if k[1] == display]
+        else:
+            stale = [k for k in self._resolved if k[0] == str(appid)]
+        for key in stale:
+            del self._resolved[key]
+        self._notify_state()
+
+    async def get_resolver_stats(self) -> dict:
+        return {
+            "hits": self._resolve_hits,
+            "misses": self._resolve_misses,
+            "entries": len(self._resolved),
+        }
+
+    def _desired_state(self) -> EffectState:
+        if not self._enabled and not self._use_cas_only:
+            return EffectState(None, generation=self._generation)
         if self._use_cas_only:
-            fx_name = FX_CAS
-        
+            return EffectState(
+                FX_CAS,
+                cas=self._current_cas,
+                sharpness=self._current_sharpness,
+                generation=self._generation,
+            )
+        map_scale, fade_near = self._mura_levels()
+        return EffectState(
+            self.current_effect, map_scale, fade_near,
+            grain=self._grain_enabled,
+            lgg=self._lgg_enabled,
+            cas=self._current_cas,
+            sharpness=self._current_sharpness,
+            generation=self._generation,
+        )
+
+    def _request_apply(self, reload: bool = False):
+        """Ask the reconciler to bring gamescope in line with the current state."""
+        if reload:
+            self._generation += 1
+        trigger, started = APPLY_TRIGGER.get()
+        self._apply_trigger = trigger
+        self._event_started = started if started is not None else time.perf_counter()
+        if self._reconciler.submit(reload):
+            self._trace.record(trigger, self._applied_state, None, "coalesced")
+        self._notify_state()
+
+    async def _reconcile(self, _reload: bool = False):
+        labels = {"profile": self.profile, "trigger": self._apply_trigger}
+        wait_ms = self._reconciler.last_wait * 1000.0
+        self._metrics.observe("apply_span_ms", wait_ms, span="wait", **labels)
+        previous = self._applied_state
+        desired = self._desired_state()
+        result = "failed"
+        started = time.perf_counter()
+        try:
+            with self._metrics.span("apply_span_ms", span="total", **labels):
+                result = await self._apply_desired(desired, labels)
+        except asyncio.CancelledError:
+            result = "cancelled"
+            raise
+        finally:
+            self._metrics.inc("applies", result=result, **labels)
+            total_ms = (time.perf_counter() - started) * 1000.0
+            self._trace.record(labels["trigger"], previous, desired, result, wait_ms, total_ms)
+
+    async def _apply_desired(self, desired: EffectState, labels: dict) -> str:
+        if desired == self._applied_state:
+            self._skipped += 1
+            self._event_started = None
+            return "skipped"
+        if desired.effect is None:
+            ok = await self._clear_effect()
+        else:
+            # A bumped generation alone re-sends the variant already rendered
+            applied = self._applied_state
+            if applied is None or desired[:-1] != applied[:-1]:
+                if not await self._patch_fx(desired, labels):
+                    return "failed"
+                self._renders += 1
+                # A cancelled reconcile may already have shown this variant
+                if (self._rendered_effect[desired.effect] == self._active_effect_source
+                        and (applied is None or desired.generation == applied.generation)):
+                    self._skipped += 1
+                    self._applied_state = desired
+                    return "skipped"
+            ok = await self._set_effect(desired.effect, labels)
+        self._writes += 1
+        if ok:
+            self._applied_state = desired
+            if desired.effect is not None:
+                self._save_effect_snapshot()
+            return "applied"
+        return "failed"
+
+    async def _patch_fx(self, state: EffectState, labels: dict | None = None) -> bool:
+        fx_name = state.effect
         path = os.path.join(FX_DIR, fx_name)
-        if not os.path.isfile(path):
-            decky.logger.error(f"[MuraDeck] FX file not found: {path}")
-            return
 
         is_sdr = (fx_name == FX_SDR)
         is_hdrscrgb = (fx_name == FX_HDRscRGB)
         
         if is_hdrscrgb:
-            grain_value = 0.1 if self._grain_enabled else 0.0
-            lgg_lift_value = 0.99992 if self._lgg_enabled else 1.0
-            lgg_gamma_value = 0.75 if self._lgg_enabled else 1.0
+            grain_value = 0.1 if state.grain else 0.0
+            lgg_lift_value = 0.99992 if state.lgg else 1.0
+            lgg_gamma_value = 0.75 if state.lgg else 1.0
         elif is_sdr:
-            grain_value = 0.01 if self._grain_enabled else 0.0
-            lgg_lift_value = 0.95 if self._lgg_enabled else 1.0
-            lgg_gamma_value = 0.98 if self._lgg_enabled else 1.0
+            grain_value = 0.01 if state.grain else 0.0
+            lgg_lift_value = 0.95 if state.lgg else 1.0
+            lgg_gamma_value = 0.98 if state.lgg else 1.0
         else:
-            if self._lgg_enabled:
+            if state.lgg:
                 lgg_lift_value = "float3(1.0, 0.99, 1.0)"
                 lgg_gamma_value = 1.0
             else:
                 lgg_lift_value = 1.0
                 lgg_gamma_value = 1.0
-            grain_value = 0.01 if self._grain_enabled else 0.0
-
-        cas_enabled = 1.0 if self._current_cas else 0.0
-        sharpness = self._current_sharpness
-
-        with open(path, "r") as f:
-            lines = f.readlines()
-
-        out = []
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            stripped = line.strip()
-
-            # CAS toggle
-            if cas_enabled is not None and "uniform float CAS_Enabled" in stripped:
-                while i < len(lines) and ">" not in lines[i]:
-                    i += 1
-                i += 1
-                out.extend([
-                    'uniform float CAS_Enabled <\n',
-                    '\tui_label = "Turn On/Off CAS";\n',
-                    '\tui_tooltip = "0 := disable, to 1 := enable.";\n',
-                    '\tui_min = 0.0; ui_max = 1.0;\n',
-                    '\tui_step = 1.0;\n',
-                    f'> = {cas_enabled};\n'
-                ])
-                continue
-
-            # patch Sharpness
-            if sharpness is not None and "uniform float Sharpness" in stripped:
-                while i < len(lines) and ">" not in lines[i]:
-                    i += 1
-                i += 1
-                out.extend([
-                    'uniform float Sharpness <\n',
-                    '\tui_type = "drag";\n',
-                    '\tui_label = "Sharpening strength";\n',
-                    '\tui_tooltip = "0 := no sharpening, to 1 := full sharpening.";\n',
-                    '\tui_min = 0.0; ui_max = 1.0;\n',
-                    f'> = {sharpness};\n'
-                ])
-                continue
-
-            # patch MuraMapScale
-            if map_scale is not None and "uniform float MuraMapScale" in stripped:
-                while i < len(lines) and ">" not in lines[i]:
-                    i += 1
-                i += 1
-                out.extend([
-                    'uniform float MuraMapScale < __UNIFORM_SLIDER_FLOAT1\n',
-                    '\tui_min = 0.0; ui_max = 5;\n',
-                    '\tui_label = "Mura Correction Strength";\n',
-                    '\tui_tooltip = "Controls how aggressive mura map.";\n',
-                    f'> = {map_scale};\n'
-                ])
-                continue
-
-            # patch MuraFadeNearWhite
-            if fade_near is not None and "uniform float MuraFadeNearWhite" in stripped:
-                while i < len(lines) and ">" not in lines[i]:
-                    i += 1
-                i += 1
-                out.extend([
-                    'uniform float MuraFadeNearWhite < __UNIFORM_SLIDER_FLOAT1\n',
-                    '\tui_min = 0.1; ui_max = 20;\n',
-                    '\tui_label = "Mura Fade Near White";\n',
-                    '\tui_tooltip = "Controls how fast mura fix fades out to bright pixel.";\n',
-                    f'> = {fade_near};\n'
-                ])
-                continue
-
-            # patch grain intensity
-            if "uniform float Intensity" in stripped:
-                while i < len(lines) and ">" not in lines[i]:
-                    i += 1
-                i += 1
-                out.extend([
-                    'uniform float Intensity < __UNIFORM_SLIDER_FLOAT1\n',
-                    '\tui_min = 0.0; ui_max = 1.0;\n',
-                    '\tui_label = "Grain Intensity";\n',
-                    '\tui_tooltip = "How visible the grain is.";\n',
-                    f'> = {grain_value};\n'
-                ])
-                continue
-
-            # patch RGB Lift/Gamma
-            if "uniform float3 RGB_Lift" in stripped:
-                while i < len(lines) and ">" not in lines[i]:
-                    i += 1
-                i += 1
-                out.extend([
-                    'uniform float3 RGB_Lift < __UNIFORM_SLIDER_FLOAT3\n',
-                    '\tui_min = 0.0; ui_max = 2.0;\n',
-                    '\tui_label = "RGB Lift";\n',
-                    '\tui_tooltip = "Adjust shadows.";\n',
-                    f'> = {lgg_lift_value};\n'
-                ])
-                continue
-
-            if "uniform float3 RGB_Gamma" in stripped:
-                while i < len(lines) and ">" not in lines[i]:
-                    i += 1
-                i += 1
-                out.extend([
-                    'uniform float3 RGB_Gamma < __UNIFORM_SLIDER_FLOAT3\n',
-                    '\tui_min = 0.1; ui_max = 3.0;\n',
-                    '\tui_label = "RGB Gamma";\n',
-                    '\tui_tooltip = "Adjust midtones.";\n',
-                    f'> = {lgg_gamma_value};\n'
-                ])
-                continue
-
-            out.append(line)
-            i += 1
-
-        with open(path, "w") as f:
-            f.writelines(out)
+            grain_value = 0.01 if state.grain else 0.0
+
+        cas_enabled = 1.0 if state.cas else 0.0
+        sharpness = state.sharpness
+
+        values = dict(
+            CAS_Enabled=cas_enabled,
+            Sharpness=sharpness,
+            MuraMapScale=state.map_scale,
+            MuraFadeNearWhite=state.fade_near,
+            Intensity=grain_value,
+            RGB_Lift=lgg_lift_value,
+            RGB_Gamma=lgg_gamma_value,
+        )
 
-        temp_path = path.replace(".fx", "_temp.fx")
         try:
-            shutil.copy(path, temp_path)
-            decky.logger.info(f"[MuraDeck] Temp effect: {temp_path}")
+            variant = await self._io.run(self._render_variant, fx_name, path, values, labels or {})
+        except FileNotFoundError:
+            decky.logger.error(f"[MuraDeck] FX file not found: {path}")
+            return False
         except Exception as e:
-            decky.logger.error(f"[MuraDeck] Temp effect failed: {e}")
+            decky.logger.error(f"[MuraDeck] Write variant for {fx_name} failed: {e}")
+            return False
+        self._rendered_effect[fx_name] = variant
 
         decky.logger.info(
-            f"[MuraDeck] FX patched: {fx_name} → Grain={grain_value}, "
+            f"[MuraDeck] FX patched: {fx_name} → {variant}, Grain={grain_value}, "
             f"LGG Lift/Gamma=({lgg_lift_value},{lgg_gamma_value})"
             f"CAS={cas_enabled}, Sharpness={sharpness}"
         )
-
-    async def _clear_effect(self):
-        cmd = (
-            'export DISPLAY=:1 && '
-            'xprop -root -f GAMESCOPE_RESHADE_EFFECT 8u '
-            '-set GAMESCOPE_RESHADE_EFFECT None'
-        )
-        env = os.environ.copy()
-        env["LD_LIBRARY_PATH"] = ""
-        proc = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=env,
-        )
-        _, err = await proc.communicate()
-        if proc.returncode == 0:
+        return True
+
+    def _render_variant(self, fx_name: str, path: str, values: dict, labels: dict) -> str:
+        with self._metrics.span("apply_span_ms", span="render", **labels):
+            text = load_fx_template(path).render(**values)
+        with self._metrics.span("apply_span_ms", span="write", **labels):
+            return self._variants.get(fx_name, text)
+
+    async def _clear_effect(self) -> bool:
+        # Shielded like _commit_effect, the write and its bookkeeping go together
+        return await asyncio.shield(self._commit_clear())
+
+    async def _commit_clear(self) -> bool:
+        if await self._write_root_utf8(":1", "GAMESCOPE_RESHADE_EFFECT", "None"):
+            self._active_effect_file = None
+            self._active_effect_source = None
             decky.logger.info("[MuraDeck] Cleared ReShade effect")
-        else:
-            decky.logger.error(f"[MuraDeck] Clear effect failed: {err.decode().strip()}")
+            return True
+        decky.logger.error("[MuraDeck] Clear effect failed")
+        return False
 
     async def direct_effect(self):
         decky.logger.info("[MuraDeck] DirectFX apply")
-        effect_name = self.current_effect or FX_SDR
-        cmd = (
-            f'export DISPLAY=:1 && '
-            f'xprop -root -f GAMESCOPE_RESHADE_EFFECT 8u '
-            f'-set GAMESCOPE_RESHADE_EFFECT {effect_name}'
-        )
-        env = os.environ.copy()
-        env["LD_LIBRARY_PATH"] = ""
-        proc = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=env,
-        )
-        _, err = await proc.communicate()
-        if proc.returncode == 0:
-            decky.logger.info(f"[MuraDeck] Effect set to {effect_name}")
-        else:
-            decky.logger.error(f"[MuraDeck] DirectFX error: {err.decode().strip()}")
+        self._request_apply()
+
+    def _reload_slot(self, effect_name: str, source: str) -> str:
+        """Copy `source` into the inactive A/B slot of `effect_name` and return its name."""
+        slot = self._effect_slot.get(effect_name, 1) ^ 1
+        name = f"{effect_name[:-3]}_{FX_RELOAD_SLOTS[slot]}.fx"
+        _atomic_copy(os.path.join(FX_DIR, source), os.path.join(FX_DIR, name))
+        self._effect_slot[effect_name] = slot
+        return name
+
+    async def _set_effect(self, effect_name: str, labels: dict) -> bool:
+        # Each rendered state has its own file name, so one write reloads it.
+        # Re-applying the active state goes through the other A/B slot instead.
+        source = self._rendered_effect.get(effect_name, effect_name)
+        target = source
+        if source == self._active_effect_source:
+            try:
+                with self._metrics.span("apply_span_ms", span="copy", **labels):
+                    target = await self._io.run(self._reload_slot, effect_name, source)
+            except Exception as e:
+                decky.logger.error(f"[MuraDeck] Reload slot for {effect_name} failed: {e}")
+
+        # A superseded apply may be cancelled, but never between the property
+        # write and the bookkeeping that records it
+        return await asyncio.shield(self._commit_effect(effect_name, source, target, labels))
+
+    async def _commit_effect(self, effect_name: str, source: str, target: str, labels: dict) -> bool:
+        with self._metrics.span("apply_span_ms", span="x_set", **labels):
+            ok = await self._write_root_utf8(":1", "GAMESCOPE_RESHADE_EFFECT", target)
+        if ok:
+            self._active_effect_file = target
+            self._active_effect_source = source
+            decky.logger.info(f"[MuraDeck] Set effect {effect_name} ({target})")
+            self._record_latency(labels)
+            if "first_effect" not in self._startup:
+                self._mark_startup("first_effect")
+                decky.logger.info(f"[MuraDeck] Startup: {self._startup}")
+            return True
+        decky.logger.error(f"[MuraDeck] Set effect failed: {target}")
+        return False
 
-    async def _set_effect(self, effect_name: str):
-        if self._use_cas_only:
-            effect_name = FX_CAS
-
-        temp = effect_name.replace(".fx", "_temp.fx")
-        cmd = (
-            f'export DISPLAY=:1 && '
-            f'xprop -root -f GAMESCOPE_RESHADE_EFFECT 8u '
-            f'-set GAMESCOPE_RESHADE_EFFECT {temp} && '
-            'sleep 0.5 && '
-            f'xprop -root -f GAMESCOPE_RESHADE_EFFECT 8u '
-            f'-set GAMESCOPE_RESHADE_EFFECT {effect_name}'
-        )
-        env = os.environ.copy()
-        env["LD_LIBRARY_PATH"] = ""
-        proc = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env=env,
-        )
-        _, err = await proc.communicate()
-        if proc.returncode == 0:
-            decky.logger.info(f"[MuraDeck] Set effect {effect_name}")
-        else:
-            decky.logger.error(f"[MuraDeck] Set effect failed: {err.decode().strip()}")
+    def _record_latency(self, labels: dict):
+        if self._event_started is None:
+            return
+        elapsed = (time.perf_counter() - self._event_started) * 1000.0
+        self._event_started = None
+        self._apply_latency.append(elapsed)
+        self._metrics.observe("effect_latency_ms", elapsed, **labels)
+        decky.logger.info(f"[MuraDeck] {labels.get('trigger', 'Event')} → effect set in {elapsed:.1f} ms")
+
+    async def get_apply_latency(self) -> dict:
+        summary = _summarize_ms(self._apply_latency)
+        if self._apply_latency:
+            summary["last_ms"] = self._apply_latency[-1]
+        return summary
+
+    async def get_io_stats(self) -> dict:
+        return self._io.stats()
+
+    async def get_metrics(self, prometheus: bool = False) -> dict:
+        """Metrics snapshot, with `prometheus` also written to METRICS_PROM_FILE."""
+        metrics = self._metrics.snapshot()
+        metrics["xprop_helpers"] = {d: helper.stats() for d, helper in self._xprop.items()}
+        metrics["x_snapshot"] = self._x_snapshot.stats()
+        if prometheus:
+            path = os.path.join(decky.DECKY_PLUGIN_RUNTIME_DIR, METRICS_PROM_FILE)
+
+            def dump():
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _atomic_write(path, self._metrics.prometheus().encode("utf-8"))
+
+            try:
+                await self._io.run(dump)
+                metrics["prometheus_file"] = path
+            except Exception as e:
+                decky.logger.error(f"[MuraDeck] Write metrics to {path} failed: {e}")
+        return metrics
+
+    async def get_apply_trace(self, limit: int | None = None) -> str:
+        """Recent apply decisions as JSONL, oldest first."""
+        return self._trace.to_jsonl(limit)
 
     async def check_shader_status(self) -> bool:
+        if self._manifest.entries is not None:
+            return self._manifest.installed(
+                [os.path.join(SHADER_DIR, f) for f in MURA_SHADER_FILES]
+                + [os.path.join(TEXTURE_DIR, f) for f in MURA_TEXTURE_FILES + [MURA_PACKED_TEXTURE]]
+            )
         shaders_exist = all(
             os.path.exists(os.path.join(SHADER_DIR, f))
             for f in MURA_SHADER_FILES
         )
         textures_exist = all(
             os.path.exists(os.path.join(TEXTURE_DIR, f))
-            for f in MURA_TEXTURE_FILES
+            for f in MURA_TEXTURE_FILES + [MURA_PACKED_TEXTURE]
         )
         return shaders_exist and textures_exist
 
     async def reinstall_shaders(self) -> bool:
         try:
-            await self._migration()
+            await self._migration(run_tools=True)
             return True
         except Exception as e:
             decky.logger.error(f"[MuraDeck] Reinstall failed: {e}")
@@ -985,9 +2025,85 @@ class Plugin:
     async def set_has_seen_welcome(self, seen: bool):
         settings.setSetting("has_seen_welcome", seen)
         settings.commit()
+        self._notify_state()
+
+    async def _state_snapshot(self) -> dict:
+        state = {
+            "enabled": self._enabled,
+            "profile": self.profile,
+            "display_mode": await self.get_display_mode(),
+            "brightness_enabled": self._brightness_enabled,
+            "grain": self._grain_enabled,
+            "lgg": self._lgg_enabled,
+            "monitor_watch": self._monitor_watch_enabled,
+            "external_display": self._is_external_display,
+            "cas_only": self._use_cas_only,
+            "has_seen_welcome": settings.getSetting("has_seen_welcome", False),
+            "cas": await self.get_cas(),
+            "sharpness": await self.get_sharpness(),
+            "app": None,
+        }
+        appid = self._state_appid
+        if appid is not None:
+            cas, sharpness = await self._resolve_app(appid)
+            state["app"] = {
+                "appid": int(appid),
+                "sharpness_perapp": await self.get_per_app_enabled(appid),
+                "sharpness": sharpness,
+                "cas_perapp": await self.get_cas_perapp_enabled(appid),
+                "cas": cas,
+            }
+        return state
+
+    async def get_state(self, appid: int | None = None) -> dict:
+        """Versioned snapshot of everything the frontend shows, `app` for `appid`."""
+        if appid is not None:
+            self._state_appid = appid
+        state = await self._state_snapshot()
+        if state != self._published_state:
+            self._published_state = state
+            self._state_version += 1
+        snapshot = dict(state, version=self._state_version)
+        snapshot["shader_ready"] = await self.check_shader_status()
+        return snapshot
+
+    def _notify_state(self):
+        self._state_dirty = True
+        if self._state_task is None or self._state_task.done():
+            self._state_task = asyncio.create_task(self._publish_state())
+
+    async def _publish_state(self):
+        # Emits state_changed(version, changes) with only the fields that differ
+        while self._state_dirty:
+            await asyncio.sleep(0)
+            self._state_dirty = False
+            state = await self._state_snapshot()
+            changes = {
+                k: v for k, v in state.items()
+                if k not in self._published_state or self._published_state[k] != v
+            }
+            if not changes:
+                continue
+            self._published_state = state
+            self._state_version += 1
+            try:
+                await emit("state_changed", self._state_version, changes)
+            except Exception as e:
+                decky.logger.error(f"[MuraDeck] Emit state_changed failed: {e}")
 
     async def _unload(self):
         decky.logger.info("[MuraDeck] Unloading...")
+        if self._x_watch_task and not self._x_watch_task.done():
+            self._x_watch_task.cancel()
+        await self._reconciler.stop()
+        await self._logs.stop()
+        self._save_log_offsets(force=True)
+        self._app_settings.flush_pending()
+        for client in self._x11.values():
+            await client.close()
+        for helper in self._xprop.values():
+            await helper.close()
+        self._io.shutdown()
 
     async def _uninstall(self):
         settings.setSetting("has_seen_welcome", False)
@@ -996,9 +2112,14 @@ class Plugin:
 
         # Remove shaders
         all_shaders = MURA_SHADER_FILES + [
+            "CAS_temp.fx",
             "MuraDeck_SDR_temp.fx",
             "MuraDeck_HDR10PQ_temp.fx",
             "MuraDeck_HDRscRGB_temp.fx",
+        ] + [
+            f"{fx[:-3]}_{slot}.fx"
+            for fx in (FX_CAS, FX_SDR, FX_HDR10PQ, FX_HDRscRGB)
+            for slot in FX_RELOAD_SLOTS
         ]
         for fn in all_shaders:
             try:
@@ -1009,8 +2130,17 @@ class Plugin:
             except Exception as e:
                 decky.logger.error(f"[MuraDeck] Delete shader {fn} error: {e}")
 
+        try:
+            self._variants.clear()
+            self._rendered_effect.clear()
+            decky.logger.info("[MuraDeck] Deleted rendered shader variants")
+        except Exception as e:
+            decky.logger.error(f"[MuraDeck] Delete shader variants error: {e}")
+
+        self._manifest.clear()
+
         # Remove textures
-        for fn in MURA_TEXTURE_FILES:
+        for fn in MURA_TEXTURE_FILES + [MURA_PACKED_TEXTURE]:
             try:
                 os.remove(os.path.join(TEXTURE_DIR, fn))
                 decky.logger.info(f"[MuraDeck] Deleted texture: {fn}")
@@ -1025,23 +2155,9 @@ class Plugin:
         except Exception as e:
             decky.logger.error(f"[MuraDeck] Clear effect failed: {e}")
 
-    async def _migration(self):
-        decky.logger.info("[MuraDeck] Migration step")
-
-        active = settings.getSetting("enabled", None)
-        if active is None:
-            decky.logger.info("[MuraDeck] First-time: disabling plugin")
-            settings.setSetting("enabled", False)
-            settings.commit()
-            self._enabled = False
-        else:
-            self._enabled = active
-
-        os.makedirs(SHADER_DIR, exist_ok=True)
-        os.makedirs(TEXTURE_DIR, exist_ok=True)
-
-        # Mura map extractor
-        decky.logger.info("[MuraDeck] Installing shaders...")
+    async def _run_mura_tools(self):
+        # galileo-mura-setup consumes what the extractor writes, so in order
+        decky.logger.info("[MuraDeck] Extracting mura maps...")
         for cmd in ["galileo-mura-extractor", "galileo-mura-setup"]:
             try:
                 env = os.environ.copy()
@@ -1053,6 +2169,7 @@ class Plugin:
                     stderr=asyncio.subprocess.PIPE,
                     env=env,
                 )
+                self._metrics.inc("subprocess_spawns", tool=cmd)
                 out, err = await proc.communicate()
                 if proc.returncode == 0:
                     decky.logger.info(f"[MuraDeck] {cmd} OK")
@@ -1060,52 +2177,99 @@ class Plugin:
                     decky.logger.error(f"[MuraDeck] {cmd} FAILED: {err.decode()}")
             except Exception as e:
                 decky.logger.error(f"[MuraDeck] Run {cmd} error: {e}")
-                    
-        # Copy from /tmp/mura
+
+    async def _install_files(self, jobs: dict) -> dict[str, bool | None]:
+        """Run install jobs concurrently on the I/O pool, None marks a failed one."""
+        names = list(jobs)
+        results = await asyncio.gather(*(self._io.run(jobs[n]) for n in names), return_exceptions=True)
+        done = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                decky.logger.error(f"[MuraDeck] Install {name} error: {result}")
+                done[name] = None
+            else:
+                if result:
+                    decky.logger.info(f"[MuraDeck] Installed {name}")
+                done[name] = result
+        return done
+
+    async def _migration(self, run_tools: bool = False):
+        decky.logger.info("[MuraDeck] Migration step")
+
+        active = settings.getSetting("enabled", None)
+        if active is None:
+            decky.logger.info("[MuraDeck] First-time: disabling plugin")
+            settings.setSetting("enabled", False)
+            settings.commit()
+            self._enabled = False
+        else:
+            self._enabled = active
+
+        started = time.perf_counter()
+        os.makedirs(SHADER_DIR, exist_ok=True)
+        os.makedirs(TEXTURE_DIR, exist_ok=True)
+
+        # The extractor only runs on an explicit reinstall or without maps
+        maps = await self._io.run(_find_mura_maps)
+        if run_tools or len(maps) < len(MURA_TEXTURE_FILES):
+            await self._run_mura_tools()
+            maps = await self._io.run(_find_mura_maps)
+        for name in MURA_TEXTURE_FILES:
+            if name not in maps:
+                decky.logger.warning(f"[MuraDeck] No {name} found in {MURA_TMP_DIR} or {MURA_CONFIG_DIR}")
+
+        # Maps and the shaders that don't sample them are independent
+        manifest = self._manifest
+        if manifest.entries is None:
+            manifest.entries = {}
+        await self._install_files({
+            **{
+                name: functools.partial(manifest.copy, src, os.path.join(TEXTURE_DIR, name))
+                for name, src in maps.items()
+            },
+            **{
+                fn: functools.partial(
+                    _install_shader, manifest,
+                    os.path.join(PLUGIN_SHADERS_DIR, fn), os.path.join(SHADER_DIR, fn), False,
+                )
+                for fn in MURA_SHADER_FILES if not fn.startswith("MuraDeck_")
+            },
+        })
+
+        # Pack both maps into one texture so the shaders sample it once
+        packed = False
         try:
-            green_tmp = glob.glob(os.path.join("/tmp/mura", "*green.png"))
-            red_tmp = glob.glob(os.path.join("/tmp/mura", "*red.png"))
-            if green_tmp:
-                shutil.copy(green_tmp[0], os.path.join(TEXTURE_DIR, "green.png"))
-                decky.logger.info("[MuraDeck] Copied green.png from /tmp/mura")
-            if red_tmp:
-                shutil.copy(red_tmp[0], os.path.join(TEXTURE_DIR, "red.png"))
-                decky.logger.info("[MuraDeck] Copied red.png from /tmp/mura")
+            await self._io.run(
+                _install_packed_texture, manifest,
+                os.path.join(TEXTURE_DIR, "red.png"),
+                os.path.join(TEXTURE_DIR, "green.png"),
+                os.path.join(TEXTURE_DIR, MURA_PACKED_TEXTURE),
+            )
+            packed = True
+        except FileNotFoundError as e:
+            decky.logger.warning(f"[MuraDeck] Mura map missing, not packing: {e}")
         except Exception as e:
-            decky.logger.error(f"[MuraDeck] Failed to copy from /tmp/mura: {e}")
+            decky.logger.warning(f"[MuraDeck] Pack mura maps failed, shaders sample both: {e}")
+
+        await self._install_files({
+            fn: functools.partial(
+                _install_shader, manifest,
+                os.path.join(PLUGIN_SHADERS_DIR, fn), os.path.join(SHADER_DIR, fn), packed,
+            )
+            for fn in MURA_SHADER_FILES if fn.startswith("MuraDeck_")
+        })
 
-        # Copy from ~/.config/gamescope/mura/{id}
         try:
-            mura_config_dir = os.path.expanduser("~/.config/gamescope/mura")
-            candidate_dirs = glob.glob(os.path.join(mura_config_dir, "*"))
-            found = False
-
-            for candidate in candidate_dirs:
-                green = glob.glob(os.path.join(candidate, "*green.png"))
-                red = glob.glob(os.path.join(candidate, "*red.png"))
-                if green and red:
-                    shutil.copy(green[0], os.path.join(TEXTURE_DIR, "green.png"))
-                    shutil.copy(red[0], os.path.join(TEXTURE_DIR, "red.png"))
-                    decky.logger.info(f"[MuraDeck] Copied green.png from {candidate}")
-                    decky.logger.info(f"[MuraDeck] Copied red.png from {candidate}")
-                    found = True
-                    break
-
-            if not found:
-                decky.logger.warning("[MuraDeck] No valid fallback texture found in ~/.config/gamescope/mura")
+            await self._io.run(manifest.save)
         except Exception as e:
-            decky.logger.error(f"[MuraDeck] Failed to fallback copy from ~/.config/gamescope/mura: {e}")
+            decky.logger.error(f"[MuraDeck] Save install manifest failed: {e}")
+        decky.logger.info(
+            f"[MuraDeck] Install done in {(time.perf_counter() - started) * 1000.0:.0f} ms, "
+            f"packed={packed}, written={manifest.written}, unchanged={manifest.unchanged}"
+        )
+        manifest.written = manifest.unchanged = 0
 
-        # Install all shaders
-        for fn in MURA_SHADER_FILES:
-            src = os.path.join(PLUGIN_SHADERS_DIR, fn)
-            dst = os.path.join(SHADER_DIR, fn)
-            try:
-                shutil.copy(src, dst)
-                os.chmod(dst, 0o644)
-                decky.logger.info(f"[MuraDeck] Installed shader {fn}")
-            except Exception as e:
-                decky.logger.error(f"[MuraDeck] Install shader {fn} error: {e}")
+        self._mark_startup("migration_done")
 
         # Welcome flag
         seen = settings.getSetting("has_seen_welcome", None)
@@ -0,0 +1,193 @@
+import base64
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+
+
+def _atomic_write(path: str, data: bytes, mode: int = 0o644):
+    """Write `data` beside `path` and rename it into place, readers never see a partial file."""
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# Rendered variants live next to the canonical shaders as `<stem>_<hash>.fx`
+FX_VARIANT_MAX_BYTES = 4 * 1024 * 1024
+RE_FX_VARIANT = re.compile(r"^(CAS|MuraDeck_\w+?)_([0-9a-f]{16})\.fx$")
+
+
+class ShaderVariantCache:
+    """Content-addressed rendered shader variants in the Shaders dir, LRU-trimmed to max_bytes."""
+
+    def __init__(self, directory: str, max_bytes: int = FX_VARIANT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._scanned = False
+
+    def _scan(self):
+        # Deferred to the first use, which runs on the I/O pool
+        self._scanned = True
+        try:
+            names = [n for n in os.listdir(self.directory) if RE_FX_VARIANT.match(n)]
+        except FileNotFoundError:
+            return
+        found = []
+        for name in names:
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            found.append((st.st_mtime_ns, name, st.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._bytes += size
+
+    def get(self, fx_name: str, text: str) -> str:
+        """Return the variant file name holding `text`, writing it if needed."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha1(data).hexdigest()[:16]
+        name = f"{fx_name[:-3]}_{digest}.fx"
+        path = os.path.join(self.directory, name)
+
+        with self._lock:
+            if not self._scanned:
+                self._scan()
+            if name in self._entries and os.path.isfile(path):
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return name
+
+            self.misses += 1
+            _atomic_write(path, data)
+
+            self._bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._evict()
+            return name
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            if not self._scanned:
+                self._scan()
+            for name in list(self._entries):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._bytes = 0
+
+
+STEAM_ICON_CACHE_MAX_BYTES = 2 * 1024 * 1024
+RE_STEAM_ICON_HASH = re.compile(r"^[0-9a-fA-F]{1,64}$")
+
+_pil = None
+
+
+def _pil_image():
+    """Pillow's Image module, imported on first use. None without Pillow."""
+    global _pil
+    if _pil is None:
+        try:
+            from PIL import Image
+            _pil = Image
+        except ImportError:
+            _pil = False
+    return _pil or None
+
+
+class SteamIconCache:
+    """LRU of base64 Steam library icons, bounded by max_bytes."""
+
+    def __init__(self, directory: str, max_bytes: int = STEAM_ICON_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, str] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, appid: int, icon_hash: str, size: int | None = None) -> str | None:
+        if not RE_STEAM_ICON_HASH.match(str(icon_hash)):
+            return None
+        path = os.path.join(self.directory, str(int(appid)), f"{icon_hash}.jpg")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if size and _pil_image() is None:
+            size = None
+        key = (int(appid), icon_hash, mtime, size)
+
+        with self._lock:
+            encoded = self._entries.get(key)
+            if encoded is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return encoded
+            self.misses += 1
+
+        encoded = base64.b64encode(self._read(path, size)).decode("utf-8")
+        with self._lock:
+            self._bytes += len(encoded) - len(self._entries.pop(key, ""))
+            self._entries[key] = encoded
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= len(old)
+                self.evictions += 1
+        return encoded
+
+    def get_many(self, items, size: int | None = None) -> list[str | None]:
+        return [self.get(appid, icon_hash, size) for appid, icon_hash in items]
+
+    @staticmethod
+    def _read(path: str, size: int | None) -> bytes:
+        if not size:
+            with open(path, "rb") as f:
+                return f.read()
+        with _pil_image().open(path) as img:
+            img.thumbnail((size, size))
+            out = io.BytesIO()
+            img.convert("RGB").save(out, "JPEG", quality=85)
+            return out.getvalue()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "thumbnails": _pil_image() is not None,
+        }
@@ -0,0 +1,398 @@
+import asyncio
+import ctypes
+import os
+import re
+import struct
+import time
+
+import decky
+
+
+LOG_CHUNK_SIZE = 64 * 1024
+LOG_POLL_INTERVAL = 0.5
+LOG_RESCAN_INTERVAL = 5.0
+LOG_SCAN_MAX_BYTES = 4 * 1024 * 1024
+
+IN_MODIFY = 0x002
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+IN_LOG_MASK = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class Inotify:
+    """Thin ctypes wrapper over the Linux inotify syscalls."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: dict[int, str] = {}
+
+    def add_watch(self, directory: str, mask: int = IN_LOG_MASK):
+        wd = self._add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch {directory} failed")
+        self._watches[wd] = directory
+
+    def read_paths(self) -> set[str]:
+        """Drain pending events and return the paths they refer to."""
+        paths = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return paths
+            i = 0
+            while i + 16 <= len(data):
+                wd, _, _, length = struct.unpack_from("iIII", data, i)
+                name = data[i + 16:i + 16 + length].split(b"\0", 1)[0]
+                paths.add(os.path.join(self._watches.get(wd, ""), os.fsdecode(name)))
+                i += 16 + length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _LogFile:
+    __slots__ = ("path", "f", "inode", "pos", "partial")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = None
+        self.inode = 0
+        self.pos = 0
+        self.partial = b""
+
+
+class LogFollower:
+    """In-process `tail -F` over several logs, resuming from `offsets`."""
+
+    def __init__(self, paths: list[str], offsets: dict | None = None,
+                 backlog: int | dict[str, int] = 0, chunk_size: int = LOG_CHUNK_SIZE):
+        self.offsets = offsets if offsets is not None else {}
+        self.backlog = backlog
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self.lines_read = 0
+        self._files = [_LogFile(p) for p in paths]
+        self._inotify: Inotify | None = None
+        self._wake = asyncio.Event()
+        self._stopping = False
+
+    def _start_notify(self, loop: asyncio.AbstractEventLoop):
+        try:
+            self._inotify = Inotify()
+            for directory in {os.path.dirname(lf.path) for lf in self._files}:
+                self._inotify.add_watch(directory)
+            loop.add_reader(self._inotify.fd, self._on_notify)
+        except Exception as e:
+            decky.logger.info(f"[MuraDeck] inotify unavailable, polling logs: {e}")
+            if self._inotify is not None:
+                self._inotify.close()
+            self._inotify = None
+
+    def _on_notify(self):
+        paths = self._inotify.read_paths()
+        if any(lf.path in paths for lf in self._files):
+            self._wake.set()
+
+    def _stop(self, loop: asyncio.AbstractEventLoop):
+        if self._inotify is not None:
+            loop.remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        for lf in self._files:
+            self._close(lf)
+
+    async def _wait(self):
+        timeout = LOG_POLL_INTERVAL if self._inotify is None else LOG_RESCAN_INTERVAL
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    def stop(self):
+        """End blocks() once the consumer asks for the next block."""
+        self._stopping = True
+        self._wake.set()
+
+    def _backlog_start(self, path: str, f, size: int) -> int:
+        backlog = self.backlog.get(path, 0) if isinstance(self.backlog, dict) else self.backlog
+        if backlog <= 0 or size == 0:
+            return size
+        start = max(0, size - self.chunk_size)
+        f.seek(start)
+        tail = f.read(size - start)
+        idx = len(tail) - 1 if tail.endswith(b"\n") else len(tail)
+        for _ in range(backlog):
+            idx = tail.rfind(b"\n", 0, idx)
+            if idx < 0:
+                return start if start == 0 else start + tail.find(b"\n") + 1
+        return start + idx + 1
+
+    def _open(self, lf: _LogFile, initial: bool):
+        try:
+            f = open(lf.path, "rb")
+        except FileNotFoundError:
+            return
+        st = os.fstat(f.fileno())
+        pos = 0
+        if initial:
+            saved = self.offsets.get(lf.path)
+            if saved and saved[0] == st.st_ino and saved[1] <= st.st_size:
+                pos = saved[1]
+            else:
+                pos = self._backlog_start(lf.path, f, st.st_size)
+        f.seek(pos)
+        lf.f, lf.inode, lf.pos, lf.partial = f, st.st_ino, pos, b""
+
+    def _close(self, lf: _LogFile):
+        if lf.f is not None:
+            lf.f.close()
+        lf.f = None
+
+    def _drain(self, lf: _LogFile):
+        """Yield what can be read from `lf` as blocks of whole lines."""
+        while True:
+            data = lf.f.read(self.chunk_size)
+            if not data:
+                return
+            lf.pos += len(data)
+            self.bytes_read += len(data)
+            cut = data.rfind(b"\n") + 1
+            if not cut:
+                lf.partial += data
+                continue
+            block = lf.partial + data[:cut] if lf.partial else data[:cut]
+            lf.partial = data[cut:]
+            self.lines_read += block.count(b"\n")
+            yield block
+
+    def _read(self, lf: _LogFile):
+        try:
+            st = os.stat(lf.path)
+        except FileNotFoundError:
+            st = None
+
+        if lf.f is not None and (st is None or st.st_ino != lf.inode):
+            # Rotated or removed: finish the old file before switching
+            yield from self._drain(lf)
+            self._close(lf)
+        if st is None:
+            return
+        if lf.f is None:
+            self._open(lf, initial=False)
+            if lf.f is None:
+                return
+        elif st.st_size < lf.pos:
+            decky.logger.info(f"[MuraDeck] Log truncated: {lf.path}")
+            lf.f.seek(0)
+            lf.pos, lf.partial = 0, b""
+        yield from self._drain(lf)
+
+    async def blocks(self):
+        """Yield (path, block) of whole newline-terminated lines appended to the logs."""
+        loop = asyncio.get_running_loop()
+        self._start_notify(loop)
+        try:
+            for lf in self._files:
+                self._open(lf, initial=True)
+            while not self._stopping:
+                for lf in self._files:
+                    for block in self._read(lf):
+                        yield lf.path, block
+                        # Only once the consumer is done with the block, a
+                        # block it was interrupted in is read again next time
+                        if lf.f is not None:
+                            self.offsets[lf.path] = [lf.inode, lf.pos - len(lf.partial)]
+                        if self._stopping:
+                            return
+                    if lf.f is not None:
+                        self.offsets[lf.path] = [lf.inode, lf.pos - len(lf.partial)]
+                await self._wait()
+        finally:
+            self._stop(loop)
+
+
+def scan_log_backwards(path: str, needle: bytes, pattern: re.Pattern,
+                       max_bytes: int = LOG_SCAN_MAX_BYTES,
+                       block: int = LOG_CHUNK_SIZE) -> re.Match | None:
+    """Match `pattern` on the newest line of `path` containing `needle`, within `max_bytes`."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        end = os.fstat(f.fileno()).st_size
+        carry = b""  # start of the line the previous block began inside
+        scanned = 0
+        while end > 0 and scanned < max_bytes:
+            start = max(0, end - block)
+            f.seek(start)
+            data = f.read(end - start) + carry
+            scanned += end - start
+            end = start
+            if start > 0:
+                cut = data.find(b"\n")
+                if cut < 0:
+                    carry = data
+                    continue
+                carry, data = data[:cut], data[cut + 1:]
+            pos = len(data)
+            while (idx := data.rfind(needle, 0, pos)) >= 0:
+                line_start = data.rfind(b"\n", 0, idx) + 1
+                line_end = data.find(b"\n", idx)
+                m = pattern.search(data, line_start, line_end if line_end >= 0 else len(data))
+                if m:
+                    return m
+                pos = line_start
+    return None
+
+
+def match_log_block(routes, block: bytes) -> list[tuple["_LogRoute", re.Match]]:
+    """(route, match) for every line of `block` a route matches, in file order."""
+    hits = []
+    for order, route in enumerate(routes):
+        needle, search = route.needle, route.pattern.search
+        pos = block.find(needle)
+        while pos >= 0:
+            line_start = block.rfind(b"\n", 0, pos) + 1
+            line_end = block.find(b"\n", pos)
+            if line_end < 0:
+                line_end = len(block)
+            m = search(block, line_start, line_end)
+            if m:
+                hits.append((line_start, order, route, m))
+            pos = block.find(needle, line_end)
+    if len(hits) > 1:
+        hits.sort(key=lambda h: (h[0], h[1]))
+    return [(route, m) for _, _, route, m in hits]
+
+
+class _LogRoute:
+    __slots__ = ("name", "paths", "needle", "pattern", "handler")
+
+    def __init__(self, name: str, paths: tuple[str, ...], needle: bytes,
+                 pattern: re.Pattern, handler):
+        self.name = name
+        self.paths = paths
+        self.needle = needle
+        self.pattern = pattern
+        self.handler = handler
+
+
+class LogMultiplexer:
+    """Follows the Steam logs once and dispatches matching lines to registered routes."""
+
+    def __init__(self, paths: list[str], offsets: dict,
+                 backlog: dict[str, int] | None = None, on_progress=None, on_handled=None):
+        self.paths = paths
+        self.offsets = offsets
+        self.backlog = backlog or {}
+        self.on_progress = on_progress
+        self.on_handled = on_handled
+        self.matched = 0
+        self._routes: dict[str, _LogRoute] = {}
+        self._table: dict[str, tuple[_LogRoute, ...]] = {}
+        self._task: asyncio.Task | None = None
+        self._follower: LogFollower | None = None
+        self._following: tuple[str, ...] = ()
+        # Paths followed since load, their saved offsets are no longer current
+        self._seen: set[str] = set()
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._routes
+
+    def register(self, name: str, paths, needle: bytes, pattern: re.Pattern, handler):
+        if name in self._routes:
+            return
+        self._routes[name] = _LogRoute(name, tuple(paths), needle, pattern, handler)
+        self._compile()
+        self._sync()
+
+    def unregister(self, name: str):
+        if self._routes.pop(name, None) is None:
+            return
+        self._compile()
+        self._sync()
+
+    def _paths(self) -> tuple[str, ...]:
+        return tuple(p for p in self.paths if p in self._table)
+
+    def _sync(self):
+        """Restart the follower when the set of routed paths changed."""
+        if self._task is not None and not self._task.done():
+            if self._follower is not None and self._paths() != self._following:
+                # Never cancelled mid-handler: the follower ends after the
+                # current block and _run picks up the new paths
+                self._follower.stop()
+            return
+        self._task = None
+        if self._paths():
+            self._task = asyncio.create_task(self._run())
+
+    def _prepare(self, paths: tuple[str, ...], live: tuple[str, ...]) -> dict[str, int]:
+        # Persisted offsets only hold for the first follower of a path after
+        # load, a path followed again later starts at its end
+        for path in paths:
+            if path in self._seen and path not in live:
+                self.offsets.pop(path, None)
+        backlog = {p: self.backlog.get(p, 0) for p in paths if p not in self._seen}
+        self._seen.update(paths)
+        self._following = paths
+        return backlog
+
+    def _compile(self):
+        table: dict[str, list[_LogRoute]] = {}
+        for route in self._routes.values():
+            for path in route.paths:
+                table.setdefault(path, []).append(route)
+        self._table = {path: tuple(routes) for path, routes in table.items()}
+
+    async def _run(self):
+        live: tuple[str, ...] = ()
+        try:
+            while paths := self._paths():
+                backlog = self._prepare(paths, live)
+                self._follower = LogFollower(list(paths), self.offsets, backlog=backlog)
+                blocks = self._follower.blocks()
+                try:
+                    async for path, block in blocks:
+                        started = time.perf_counter()
+                        for route, m in match_log_block(self._table.get(path, ()), block):
+                            if route.name not in self._routes:
+                                continue  # unregistered by an earlier handler
+                            self.matched += 1
+                            try:
+                                await route.handler(m)
+                            except Exception as e:
+                                decky.logger.error(f"[MuraDeck] Log handler {route.name} error: {e}")
+                            if self.on_handled:
+                                self.on_handled(route.name, started)
+                        if self.on_progress:
+                            self.on_progress()
+                finally:
+                    await blocks.aclose()
+                    self._follower = None
+                live = paths
+        finally:
+            self._following = ()
+
+    async def stop(self):
+        self._routes.clear()
+        self._table = {}
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
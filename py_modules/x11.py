@@ -0,0 +1,467 @@
+import asyncio
+import os
+import re
+import struct
+import time
+from typing import TYPE_CHECKING
+
+import decky
+
+if TYPE_CHECKING:
+    from main import Metrics
+
+
+X11_SOCKET_DIR = "/tmp/.X11-unix"
+X_ATOM_CARDINAL = 6
+X_PROPERTY_NOTIFY = 28
+X_PROPERTY_CHANGE_MASK = 0x400000
+X_TIMEOUT = 2.0
+X_RETRY_DELAY = 10.0
+X_SNAPSHOT_TTL = 0.1
+
+
+class XError(Exception):
+    pass
+
+
+def _x_pad(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 4)
+
+
+def _xauth_cookie(display_num: str) -> tuple[bytes, bytes]:
+    """Find a MIT-MAGIC-COOKIE-1 entry for the display, or no auth at all."""
+    path = os.environ.get("XAUTHORITY") or os.path.expanduser("~/.Xauthority")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return b"", b""
+
+    i = 0
+    while i + 2 <= len(data):
+        try:
+            i += 2  # family
+            fields = []
+            for _ in range(4):
+                (n,) = struct.unpack_from(">H", data, i)
+                fields.append(data[i + 2:i + 2 + n])
+                i += 2 + n
+        except struct.error:
+            break
+        _, number, name, cookie = fields
+        if number in (display_num.encode(), b"") and name == b"MIT-MAGIC-COOKIE-1":
+            return name, cookie
+    return b"", b""
+
+
+class XPropertyClient:
+    """Minimal async X11 client for root window properties over the display socket."""
+
+    def __init__(self, display: str, socket_path: str | None = None):
+        self.display = display
+        self.number = display.lstrip(":").split(".")[0]
+        self.socket_path = socket_path or os.path.join(X11_SOCKET_DIR, f"X{self.number}")
+        self.root = 0
+        self.connects = 0
+        self.requests = 0
+
+        self._writer: asyncio.StreamWriter | None = None
+        self._recv_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._seq = 0
+        self._pending: dict[int, asyncio.Future] = {}
+        self._void_errors: dict[int, XError] = {}
+        self._watched: dict[int, str] = {}
+        self._events: asyncio.Queue | None = None
+        self._atoms: dict[str, int] = {}
+        self._retry_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _connect(self):
+        async with self._lock:
+            if self.connected:
+                return
+            if time.monotonic() < self._retry_at:
+                raise ConnectionError(f"X display {self.display} unavailable")
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.socket_path), X_TIMEOUT
+                )
+                name, cookie = _xauth_cookie(self.number)
+                writer.write(
+                    struct.pack("<BxHHHHxx", 0x6C, 11, 0, len(name), len(cookie))
+                    + _x_pad(name) + _x_pad(cookie)
+                )
+                head = await asyncio.wait_for(reader.readexactly(8), X_TIMEOUT)
+                status, reason_len, _, _, length = struct.unpack("<BBHHH", head)
+                body = await asyncio.wait_for(reader.readexactly(length * 4), X_TIMEOUT)
+                if status != 1:
+                    reason = body[:reason_len].decode("latin-1", "ignore")
+                    raise XError(f"X setup on {self.display} refused: {reason}")
+
+                (vendor_len,) = struct.unpack_from("<H", body, 16)
+                formats = body[21]
+                offset = 32 + vendor_len + (-vendor_len % 4) + 8 * formats
+                (self.root,) = struct.unpack_from("<I", body, offset)
+            except BaseException as e:
+                # Refused, timed out, unparsable or cancelled: don't leak the socket
+                if writer is not None:
+                    writer.close()
+                    try:
+                        await writer.wait_closed()
+                    except Exception:
+                        pass
+                if isinstance(e, Exception):
+                    self._retry_at = time.monotonic() + X_RETRY_DELAY
+                raise
+
+            self._writer = writer
+            self._seq = 0
+            self._atoms.clear()
+            self._recv_task = asyncio.create_task(self._recv_loop(reader))
+            self.connects += 1
+
+    async def _recv_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                head = await reader.readexactly(32)
+                (seq,) = struct.unpack_from("<H", head, 2)
+                if head[0] == 1:
+                    (extra,) = struct.unpack_from("<I", head, 4)
+                    body = head + (await reader.readexactly(extra * 4) if extra else b"")
+                    fut = self._pending.pop(seq, None)
+                    if fut and not fut.done():
+                        fut.set_result(body)
+                elif head[0] == 0:
+                    err = XError(f"X error {head[1]} for request {head[10]} on {self.display}")
+                    fut = self._pending.pop(seq, None)
+                    if fut and not fut.done():
+                        fut.set_exception(err)
+                    else:
+                        self._void_errors[seq] = err
+                elif (head[0] & 0x7F) == X_PROPERTY_NOTIFY and self._events is not None:
+                    (atom,) = struct.unpack_from("<I", head, 8)
+                    name = self._watched.get(atom)
+                    if name:
+                        self._events.put_nowait(name)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            self._drop()
+
+    def _drop(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError(f"X display {self.display} disconnected"))
+        self._pending.clear()
+        self._void_errors.clear()
+        if self._events is not None:
+            self._events.put_nowait(None)
+            self._events = None
+        self._watched.clear()
+
+    def _send(self, data: bytes) -> int:
+        self._seq = (self._seq + 1) & 0xFFFF
+        self._writer.write(data)
+        self.requests += 1
+        return self._seq
+
+    async def _roundtrip(self, data: bytes) -> bytes:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[self._send(data)] = fut
+        try:
+            return await asyncio.wait_for(fut, X_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._drop()
+            raise
+
+    async def _void(self, data: bytes):
+        """Send a request without a reply, then sync so its error can surface."""
+        seq = self._send(data)
+        await self._roundtrip(struct.pack("<BxH", 43, 1))  # GetInputFocus
+        err = self._void_errors.pop(seq, None)
+        if err:
+            raise err
+
+    async def _atom(self, name: str) -> int:
+        atom = self._atoms.get(name)
+        if atom is None:
+            data = name.encode()
+            reply = await self._roundtrip(
+                struct.pack("<BBHHxx", 16, 0, 2 + len(_x_pad(data)) // 4, len(data))
+                + _x_pad(data)
+            )
+            (atom,) = struct.unpack_from("<I", reply, 8)
+            self._atoms[name] = atom
+        return atom
+
+    async def _call(self, op, *args):
+        for attempt in (0, 1):
+            await self._connect()
+            try:
+                return await op(*args)
+            except (ConnectionError, asyncio.TimeoutError):
+                self._drop()
+                if attempt:
+                    raise
+
+    async def _get(self, name: str) -> tuple[int, int, bytes] | None:
+        prop = await self._atom(name)
+        reply = await self._roundtrip(
+            struct.pack("<BBHIIIII", 20, 0, 6, self.root, prop, 0, 0, 1024)
+        )
+        fmt = reply[1]
+        prop_type, _, length = struct.unpack_from("<III", reply, 8)
+        if prop_type == 0:
+            return None
+        return prop_type, fmt, reply[32:32 + length * (fmt // 8)]
+
+    async def _set(self, name: str, type_name: str | None, fmt: int, data: bytes):
+        prop = await self._atom(name)
+        prop_type = await self._atom(type_name) if type_name else X_ATOM_CARDINAL
+        await self._void(
+            struct.pack(
+                "<BBHIIIBxxxI", 18, 0, 6 + len(_x_pad(data)) // 4,
+                self.root, prop, prop_type, fmt, len(data) // (fmt // 8),
+            )
+            + _x_pad(data)
+        )
+
+    @staticmethod
+    def _cardinal(value: tuple[int, int, bytes] | None) -> int | None:
+        if value is None or value[1] != 32 or len(value[2]) < 4:
+            return None
+        return struct.unpack_from("<I", value[2])[0]
+
+    async def _get_many(self, names: list[str]) -> list:
+        return await asyncio.gather(*(self._get(name) for name in names))
+
+    async def get_cardinal(self, name: str) -> int | None:
+        return self._cardinal(await self._call(self._get, name))
+
+    async def get_cardinals(self, names: list[str]) -> dict[str, int | None]:
+        """Read several CARDINALs with the requests pipelined in one round trip."""
+        values = await self._call(self._get_many, names)
+        return {name: self._cardinal(value) for name, value in zip(names, values)}
+
+    async def set_utf8(self, name: str, value: str):
+        await self._call(self._set, name, "UTF8_STRING", 8, value.encode("utf-8"))
+
+    async def _subscribe(self, names: list[str]) -> asyncio.Queue:
+        self._watched = {await self._atom(name): name for name in names}
+        self._events = asyncio.Queue()
+        await self._void(
+            struct.pack("<BxHII", 2, 4, self.root, 0x800)  # ChangeWindowAttributes
+            + struct.pack("<I", X_PROPERTY_CHANGE_MASK)
+        )
+        return self._events
+
+    async def subscribe(self, names: list[str]) -> asyncio.Queue:
+        """Watch `names` on the root window, the queue yields changed names and None on disconnect."""
+        return await self._call(self._subscribe, names)
+
+    async def close(self):
+        if self._recv_task and not self._recv_task.done():
+            self._recv_task.cancel()
+        self._drop()
+
+
+# Reads `get NAME...` / `set NAME VALUE` lines, answers each with the xprop
+# output and a "\x1e<exit status>" line
+XPROP_HELPER_SCRIPT = r"""
+while read -r cmd args; do
+    case "$cmd" in
+        get) xprop -root $args 2>&1 ;;
+        set) name=${args%% *}; xprop -root -f "$name" 8u -set "$name" "${args#* }" 2>&1 ;;
+        *) echo "unknown command: $cmd"; false ;;
+    esac
+    printf '\036%d\n' "$?"
+done
+"""
+XPROP_REPLY_END = b"\x1e"
+RE_XPROP_CARDINAL = re.compile(r"^(\w+)\(CARDINAL\) = (\d+)", re.M)
+
+
+class XpropHelper:
+    """Long-lived shell per display running xprop for commands read from its stdin."""
+
+    def __init__(self, display: str, metrics: "Metrics | None" = None):
+        self.display = display
+        self.spawns = 0
+        self.crashes = 0
+        self.requests = 0
+        self._metrics = metrics
+        self._proc: asyncio.subprocess.Process | None = None
+        self._lock = asyncio.Lock()
+
+    async def _spawn(self):
+        env = os.environ.copy()
+        env["DISPLAY"] = self.display
+        env["LD_LIBRARY_PATH"] = ""
+        self._proc = await asyncio.create_subprocess_exec(
+            "/bin/sh", "-c", XPROP_HELPER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=env,
+        )
+        self.spawns += 1
+        if self._metrics is not None:
+            self._metrics.inc("subprocess_spawns", tool="xprop_helper", display=self.display)
+        decky.logger.info(f"[MuraDeck] Started xprop helper for {self.display} (pid {self._proc.pid})")
+
+    def _discard(self, reason):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        self.crashes += 1
+        decky.logger.warning(f"[MuraDeck] xprop helper for {self.display} dropped: {reason}")
+
+    async def _exchange(self, line: bytes) -> tuple[int, str]:
+        if self._proc is not None and self._proc.returncode is not None:
+            self._discard(f"exited with {self._proc.returncode}")
+        if self._proc is None:
+            await self._spawn()
+        proc = self._proc
+        proc.stdin.write(line)
+        await proc.stdin.drain()
+        output = []
+        while True:
+            reply = await proc.stdout.readline()
+            if not reply:
+                raise ConnectionError(f"xprop helper for {self.display} exited")
+            if reply.startswith(XPROP_REPLY_END):
+                return int(reply[1:]), b"".join(output).decode("utf-8", "replace").strip()
+            output.append(reply)
+
+    async def _request(self, line: str) -> str:
+        if "\n" in line:
+            raise ValueError("xprop helper commands are single lines")
+        data = line.encode("utf-8") + b"\n"
+        async with self._lock:
+            for attempt in (0, 1):
+                try:
+                    status, output = await asyncio.wait_for(self._exchange(data), X_TIMEOUT)
+                    break
+                except ConnectionError as e:
+                    # Crashed helper: respawn once for this request
+                    self._discard(e)
+                    if attempt:
+                        raise
+                except asyncio.TimeoutError:
+                    self._discard("no reply")
+                    raise
+                except BaseException as e:
+                    # Cancelled mid-exchange: its reply would answer the next request
+                    self._discard(f"request interrupted ({type(e).__name__})")
+                    raise
+        self.requests += 1
+        if status != 0:
+            raise XError(f"xprop on {self.display} failed ({status}): {output}")
+        return output
+
+    async def get_cardinals(self, names: list[str]) -> dict[str, int | None]:
+        output = await self._request("get " + " ".join(names))
+        values = {m.group(1): int(m.group(2)) for m in RE_XPROP_CARDINAL.finditer(output)}
+        return {name: values.get(name) for name in names}
+
+    async def set_utf8(self, name: str, value: str):
+        await self._request(f"set {name} {value}")
+
+    def stats(self) -> dict:
+        return {
+            "spawns": self.spawns,
+            "crashes": self.crashes,
+            "requests": self.requests,
+            "running": self._proc is not None and self._proc.returncode is None,
+        }
+
+    async def close(self):
+        proc, self._proc = self._proc, None
+        if proc is None or proc.returncode is not None:
+            return
+        proc.stdin.close()
+        try:
+            await asyncio.wait_for(proc.wait(), X_TIMEOUT)
+        except asyncio.TimeoutError:
+            proc.kill()
+
+
+class PropertySnapshot:
+    """Short-lived snapshot of property reads, concurrent callers share one read."""
+
+    def __init__(self, read, ttl: float = X_SNAPSHOT_TTL, metrics: "Metrics | None" = None):
+        self.ttl = ttl
+        self.reads = 0
+        self.hits = 0
+        self.joined = 0
+        self._read = read
+        self._metrics = metrics
+        self._values: dict[str, tuple[float, int | None]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def _saved(self, reason: str):
+        if reason == "hit":
+            self.hits += 1
+        else:
+            self.joined += 1
+        if self._metrics is not None:
+            self._metrics.inc("x_reads_saved", reason=reason)
+
+    async def _fetch(self, names: list[str], started: float) -> dict:
+        self.reads += 1
+        try:
+            values = await self._read(names)
+        finally:
+            for name in names:
+                if self._inflight.get(name) is asyncio.current_task():
+                    del self._inflight[name]
+        for name in names:
+            self._values[name] = (started, values.get(name))
+        return values
+
+    async def get(self, names: list[str]) -> dict[str, int | None]:
+        now = time.monotonic()
+        out: dict[str, int | None] = {}
+        waiting: dict[str, asyncio.Task] = {}
+        missing: list[str] = []
+        for name in names:
+            cached = self._values.get(name)
+            if cached is not None and now - cached[0] < self.ttl:
+                out[name] = cached[1]
+            elif name in self._inflight:
+                waiting[name] = self._inflight[name]
+            else:
+                missing.append(name)
+
+        if not missing:
+            self._saved("joined" if waiting else "hit")
+        else:
+            task = asyncio.create_task(self._fetch(missing, now))
+            # Its error is raised to every caller, don't warn if none is left
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            for name in missing:
+                self._inflight[name] = task
+                waiting[name] = task
+        # The read runs in its own task, a cancelled caller leaves it to the others
+        for name, task in waiting.items():
+            out[name] = (await asyncio.shield(task)).get(name)
+        return out
+
+    def invalidate(self):
+        self._values.clear()
+
+    def stats(self) -> dict:
+        return {"ttl_s": self.ttl, "reads": self.reads, "hits": self.hits, "joined": self.joined}
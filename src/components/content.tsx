@@ -13,6 +13,7 @@ import { EffectInfo } from "./styles/effectInfo";
 import { StatusButton } from "./styles/statusButton";
 
 import { DisplayMode } from "../hooks/displayMode";
+import { BackendState, fetchState, useBackendState } from "../hooks/backendState";
 import { Desc } from "./defines/descriptor";
 
 export function Content() {
@@ -62,67 +63,40 @@ export function Content() {
     setLoading(false);
   };
 
-  // Refresh all related state from backend
-  const refreshAll = useCallback(async () => {
-    // external monitor
-    try {
-      const ext = await call<[], boolean>("is_external_display");
-      setExternalMonitor(ext);
-    } catch { }
+  const applyState = useCallback((s: BackendState) => {
+    setExternalMonitor(s.external_display);
+    setEnabled(s.enabled);
+    setMonitorWatch(s.monitor_watch);
+    setBrightnessEnabled(s.brightness_enabled);
+    setWelcomePassed(s.has_seen_welcome);
+    if (s.shader_ready !== undefined) setShaderReady(s.shader_ready);
+    setGrain(s.grain);
+    setLGG(s.lgg);
+
+    // per-app or global sharpness & CAS
+    if (s.app && s.app.appid === currentApp?.appid) {
+      setPerAppSharpness(s.app.sharpness_perapp);
+      setSharpness(s.app.sharpness);
+      setPerAppCas(s.app.cas_perapp);
+      setCasEnabled(s.app.cas);
+    } else if (!currentApp?.appid) {
+      setSharpness(s.sharpness);
+      setCasEnabled(s.cas);
+    }
+  }, [currentApp?.appid]);
 
-    // global toggles + welcome + shader status
+  // Refresh all related state from backend in one snapshot
+  const refreshAll = useCallback(async () => {
     try {
-      const [en, mon, bright, seen, ok] = await Promise.all([
-        call<[], boolean>("get_enabled"),
-        call<[], boolean>("get_ext_monitor_watcher"),
-        call<[], boolean>("get_brightness_enabled"),
-        call<[], boolean>("get_has_seen_welcome"),
-        call<[], boolean>("check_shader_status"),
-      ]);
-      setEnabled(en);
-      setMonitorWatch(mon);
-      setBrightnessEnabled(bright);
-      setWelcomePassed(seen);
-      setShaderReady(ok);
+      applyState(await fetchState(currentApp?.appid));
     } catch { }
+  }, [currentApp?.appid, applyState]);
 
-    // grain & LGG
-    if (displayMode !== null) {
-      try {
-        const [g, l] = await Promise.all([
-          call<[], boolean>("get_grain"),
-          call<[], boolean>("get_lgg"),
-        ]);
-        setGrain(g);
-        setLGG(l);
-      } catch { }
-    }
-
-    // per-app or global sharpness & CAS
-    if (currentApp?.appid) {
-      try {
-        const [sEn, sVal, cEn, cVal] = await Promise.all([
-          call<[number], boolean>("get_sharpness_perapp_enabled", currentApp.appid),
-          call<[number], number>("get_sharpness", currentApp.appid),
-          call<[number], boolean>("get_cas_perapp_enabled", currentApp.appid),
-          call<[number], boolean>("get_cas", currentApp.appid),
-        ]);
-        setPerAppSharpness(sEn);
-        setSharpness(sVal);
-        setPerAppCas(cEn);
-        setCasEnabled(cVal);
-      } catch { }
-    } else {
-      try {
-        const [sVal, cVal] = await Promise.all([
-          call<[], number>("get_sharpness"),
-          call<[], boolean>("get_cas"),
-        ]);
-        setSharpness(sVal);
-        setCasEnabled(cVal);
-      } catch { }
-    }
-  }, [currentApp?.appid, displayMode]);
+  // Follow pushed state_changed deltas
+  const backendState = useBackendState();
+  useEffect(() => {
+    if (backendState) applyState(backendState);
+  }, [backendState, applyState]);
 
   // Init + backend→frontend events
   useEffect(() => {
@@ -158,10 +132,11 @@ export function Content() {
             const fmt = app.icon_data_format ?? "png";
             iconUrl = `data:image/${fmt};base64,${app.icon_data}`;
           } else if (app.icon_hash) {
-            const b64 = await call<[number, string], string | null>(
+            const b64 = await call<[number, string, number], string | null>(
               "get_steam_icon",
               app.appid,
-              app.icon_hash
+              app.icon_hash,
+              64
             );
             if (b64) iconUrl = `data:image/jpeg;base64,${b64}`;
           }
@@ -0,0 +1,80 @@
+import { useEffect, useState } from "react";
+import { call, addEventListener, removeEventListener } from "@decky/api";
+
+export interface AppState {
+  appid: number;
+  sharpness_perapp: boolean;
+  sharpness: number;
+  cas_perapp: boolean;
+  cas: boolean;
+}
+
+export interface BackendState {
+  version: number;
+  enabled: boolean;
+  profile: string;
+  display_mode: string;
+  brightness_enabled: boolean;
+  grain: boolean;
+  lgg: boolean;
+  monitor_watch: boolean;
+  external_display: boolean;
+  cas_only: boolean;
+  has_seen_welcome: boolean;
+  shader_ready?: boolean;
+  cas: boolean;
+  sharpness: number;
+  app: AppState | null;
+}
+
+let cached: BackendState | null = null;
+const subscribers = new Set<(state: BackendState) => void>();
+
+const publish = (state: BackendState) => {
+  cached = state;
+  subscribers.forEach((fn) => fn(state));
+};
+
+export async function fetchState(appid?: number): Promise<BackendState> {
+  const state = await call<[number | null], BackendState>(
+    "get_state",
+    appid ?? cached?.app?.appid ?? null
+  );
+  publish({ ...cached, ...state });
+  return state;
+}
+
+export function getCachedState(): BackendState | null {
+  return cached;
+}
+
+// Keeps the local copy in sync from state_changed deltas, refetching on a gap
+export function registerStateListener(): () => void {
+  const onChange = (version: number, changes: Partial<BackendState>) => {
+    if (cached && version <= cached.version) return;
+    if (!cached || version !== cached.version + 1) {
+      fetchState().catch((e) => console.error("[MuraDeck] get_state failed", e));
+      return;
+    }
+    publish({ ...cached, ...changes, version });
+  };
+
+  const listener = addEventListener<[number, Partial<BackendState>]>("state_changed", onChange);
+  fetchState().catch((e) => console.error("[MuraDeck] get_state failed", e));
+
+  return () => removeEventListener("state_changed", listener);
+}
+
+export function useBackendState(): BackendState | null {
+  const [state, setState] = useState<BackendState | null>(cached);
+
+  useEffect(() => {
+    subscribers.add(setState);
+    if (cached) setState(cached);
+    return () => {
+      subscribers.delete(setState);
+    };
+  }, []);
+
+  return state;
+}
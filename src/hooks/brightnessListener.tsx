@@ -1,4 +1,5 @@
 import { callable } from "@decky/api";
+import { getCachedState } from "./backendState";
 
 const getPluginEnabled = callable<[], boolean>("get_enabled");
 const brightnessState = callable<[number], void>("brightness_state");
@@ -7,7 +8,7 @@ export function registerBrightnessListener(): () => void {
   try {
     const reg = window.SteamClient.System.Display.RegisterForBrightnessChanges(
       async ({ flBrightness }: { flBrightness: number }) => {
-        const enabled = await getPluginEnabled();
+        const enabled = getCachedState()?.enabled ?? (await getPluginEnabled());
         if (!enabled) return;
 
         const pct = Math.round(flBrightness * 100);
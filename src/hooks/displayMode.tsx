@@ -1,16 +1,5 @@
-import { useEffect, useState } from "react";
-import { call } from "@decky/api";
+import { useBackendState } from "./backendState";
 
 export function DisplayMode(): string | null {
-  const [mode, setMode] = useState<string | null>(null);
-
-  useEffect(() => {
-    const fetch = async () => {
-      const result = await call<[], string>("get_display_mode");
-      setMode(result);
-    };
-    fetch();
-  }, []);
-
-  return mode;
+  return useBackendState()?.display_mode ?? null;
 }
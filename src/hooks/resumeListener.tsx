@@ -1,4 +1,5 @@
 import { callable } from "@decky/api";
+import { getCachedState } from "./backendState";
 
 const getPluginEnabled = callable<[], boolean>("get_enabled");
 const resumeFromSuspend = callable<[], void>("resume_from_suspend");
@@ -6,7 +7,7 @@ const resumeFromSuspend = callable<[], void>("resume_from_suspend");
 export function registerResumeListener(): () => void {
   const onResume = async () => {
     console.log("[MuraDeck] [Resume] Steam Deck resumed from suspend.");
-    const enabled = await getPluginEnabled();
+    const enabled = getCachedState()?.enabled ?? (await getPluginEnabled());
     if (enabled) {
       await resumeFromSuspend();
     }
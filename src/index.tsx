@@ -13,6 +13,7 @@ import { isNewUser } from "./hooks/newUser";
 import { registerResumeListener } from "./hooks/resumeListener";
 import { registerBrightnessListener } from "./hooks/brightnessListener";
 import { registerGameStateListener } from "./hooks/gameListener";
+import { registerStateListener } from "./hooks/backendState";
 
 const getPluginEnabled = callable<[], boolean>("get_enabled");
 const directEffect = callable<[], void>("direct_effect");
@@ -34,6 +35,7 @@ export default definePlugin(() => {
     }
   })();
 
+  const unregisterState = registerStateListener();
   const unregisterResume = registerResumeListener();
   const unregisterBrightness = registerBrightnessListener();
 
@@ -47,6 +49,7 @@ export default definePlugin(() => {
       routerHook.removeRoute(MENU_ROUTE);
       unregisterBrightness?.();
       unregisterResume?.();
+      unregisterState?.();
     },
   };
 });